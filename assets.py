@@ -0,0 +1,83 @@
+"""
+Assets - srcset and CSS url() parsing for image discovery
+by abderrafie
+"""
+import argparse
+import re
+
+IMAGE_SIZE_CHOICES = ['largest', 'smallest']
+SRCSET_URL_PATTERN = re.compile(r'[\s,]*(\S+)')
+DESCRIPTOR_PATTERN = re.compile(r'(\d+(?:\.\d+)?)([wx])$', re.I)
+CSS_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)', re.I)
+
+
+def parse_srcset(srcset):
+    """Yield (url, width, density) for each candidate of a srcset; the unused one of width/density is None
+
+    As in the HTML spec a URL runs to the next whitespace, so it may
+    contain commas; trailing commas end the candidate.
+    """
+    position = 0
+    while True:
+        match = SRCSET_URL_PATTERN.match(srcset, position)
+        if not match:
+            return
+        url = match.group(1)
+        position = match.end()
+        descriptors = ''
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            end = srcset.find(',', position)
+            end = len(srcset) if end == -1 else end
+            descriptors, position = srcset[position:end].strip(), end + 1
+        if not url:
+            continue
+        descriptor = DESCRIPTOR_PATTERN.match(descriptors)
+        if not descriptor:
+            yield url, None, 1.0
+        elif descriptor.group(2).lower() == 'w':
+            yield url, int(float(descriptor.group(1))), None
+        else:
+            yield url, None, float(descriptor.group(1))
+
+
+def css_urls(css):
+    """URLs referenced with url(...) in a stylesheet or style attribute"""
+    return [match.group(2).strip() for match in CSS_URL_PATTERN.finditer(css)]
+
+
+def parse_image_size(value):
+    """argparse type for --image-size: largest, smallest or a target width in pixels"""
+    if value in IMAGE_SIZE_CHOICES:
+        return value
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise argparse.ArgumentTypeError(f'expected largest, smallest or a width in pixels, not {value!r}')
+
+
+def pick_candidate(candidates, preference='largest'):
+    """Choose one (url, width, density) candidate of an image.
+
+    preference is 'largest', 'smallest' or a target width in pixels, for
+    which the narrowest candidate at least that wide is picked (the widest
+    one if none is). Width descriptors are preferred over densities; when
+    only densities are known a target width picks the 1x candidate.
+    """
+    if not candidates:
+        return None
+    sized = [candidate for candidate in candidates if candidate[1] is not None]
+    if sized:
+        if preference == 'smallest':
+            return min(sized, key=lambda candidate: candidate[1])
+        if preference != 'largest':
+            wide_enough = [candidate for candidate in sized if candidate[1] >= preference]
+            if wide_enough:
+                return min(wide_enough, key=lambda candidate: candidate[1])
+        return max(sized, key=lambda candidate: candidate[1])
+
+    if preference == 'smallest':
+        return min(candidates, key=lambda candidate: candidate[2])
+    if preference != 'largest':
+        return min(candidates, key=lambda candidate: abs(candidate[2] - 1))
+    return max(candidates, key=lambda candidate: candidate[2])
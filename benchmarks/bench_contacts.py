@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Contact extraction micro-benchmark
+by abderrafie
+
+Compares the single-pass contact scanner against the previous
+implementation (one email scan plus five phone scans) on large
+synthetic pages, after checking both on known contact spellings.
+
+    python3 benchmarks/bench_contacts.py [--size-mb 4] [--repeat 5]
+"""
+import os
+import sys
+import argparse
+import random
+import re
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from email_phone_extractor import EmailPhoneExtractor, normalize_phone
+
+# Previous implementation, kept here as the reference point
+LEGACY_EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+LEGACY_PHONE_PATTERNS = [
+    re.compile(r'\+\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}'),
+    re.compile(r'\(\d{3}\)[-.\s]?\d{3}[-.\s]?\d{4}'),
+    re.compile(r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'),
+    re.compile(r'\d{3}\.\d{3}\.\d{4}'),
+    re.compile(r'\d{10}'),
+]
+
+# (text, phones the single pass must report for region US)
+KNOWN_CONTACTS = [
+    ('Call 800-555-0199', {'+18005550199'}),
+    ('Call (800) 555-0199', {'+18005550199'}),
+    ('Call 800.555.0199', {'+18005550199'}),
+    ('Call 8005550199', {'+18005550199'}),
+    ('Call 1-800-555-0199', {'+18005550199'}),
+    ('Call 1.800.555.0199', {'+18005550199'}),
+    ('Call 1 800 555 0199', {'+18005550199'}),
+    ('Call 1 (800) 555-0199', {'+18005550199'}),
+    ('Call +1 800 555 0199', {'+18005550199'}),
+    ('Call +44 20 7946 0958', {'+442079460958'}),
+    ('Order 123456789012', set()),
+]
+
+
+def legacy_extract(text):
+    emails = set(LEGACY_EMAIL_PATTERN.findall(text))
+    phones = set()
+    for pattern in LEGACY_PHONE_PATTERNS:
+        phones.update(pattern.findall(text))
+    return emails, phones
+
+
+def synthetic_page(size, seed=42):
+    """Prose with emails, phone numbers in every supported format and digit noise"""
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'contact', 'office', 'hours', 'order', 'id']
+    formats = ['({a}) {b}-{c}', '{a}-{b}-{c}', '{a}.{b}.{c}', '{a}{b}{c}', '+1 {a} {b} {c}', '+44 20 {b} {c}',
+               '1-{a}-{b}-{c}', '1.{a}.{b}.{c}', '1 {a} {b} {c}']
+    parts = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.02:
+            part = f"user{rng.randint(0, 999)}@example{rng.randint(0, 9)}.com"
+        elif roll < 0.04:
+            part = rng.choice(formats).format(a=rng.randint(200, 999), b=rng.randint(200, 999),
+                                              c=rng.randint(1000, 9999))
+        elif roll < 0.06:
+            part = str(rng.randint(10 ** 11, 10 ** 14))  # order numbers, not phones
+        else:
+            part = rng.choice(words)
+        parts.append(part)
+        length += len(part) + 1
+    return ' '.join(parts)
+
+
+def check_known_contacts(extractor):
+    """Problems with the single pass on KNOWN_CONTACTS, including numbers only the legacy scans find"""
+    problems = []
+    for text, expected in KNOWN_CONTACTS:
+        _, phones = extractor.extract_emails_and_phones(text)
+        _, legacy_phones = legacy_extract(text)
+        legacy = {normalize_phone(phone, 'US') for phone in legacy_phones} - {None}
+        if phones != expected:
+            problems.append(f"{text!r}: found {sorted(phones)}, expected {sorted(expected)}")
+        elif expected and not legacy & phones:
+            problems.append(f"{text!r}: legacy found {sorted(legacy)}, single pass {sorted(phones)}")
+    return problems
+
+
+def bench(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark contact extraction throughput')
+    parser.add_argument('--size-mb', type=float, default=4, help='Synthetic page size in MB (default: 4)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation; the best is kept (default: 5)')
+    args = parser.parse_args()
+
+    text = synthetic_page(int(args.size_mb * 1024 * 1024))
+    megabytes = len(text) / (1024 * 1024)
+    extractor = EmailPhoneExtractor(region='US')
+    problems = check_known_contacts(extractor)
+    for problem in problems:
+        print(f"WRONG: {problem}")
+
+    legacy_time, (legacy_emails, legacy_phones) = bench(legacy_extract, text, args.repeat)
+    new_time, (emails, phones) = bench(extractor.extract_emails_and_phones, text, args.repeat)
+
+    print(f"Page size: {megabytes:.1f} MB")
+    print(f"legacy (6 scans):  {megabytes / legacy_time:8.1f} MB/s  "
+          f"{len(legacy_emails)} emails, {len(legacy_phones)} phones")
+    print(f"single pass:       {megabytes / new_time:8.1f} MB/s  "
+          f"{len(emails)} emails, {len(phones)} phones")
+    print(f"Speedup: {legacy_time / new_time:.2f}x")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
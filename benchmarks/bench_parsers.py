@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+HTML parser backend benchmark
+by abderrafie
+
+Parses a corpus of saved HTML files with every backend, extracting
+links, images and text, and reports pages/s and peak memory per page.
+
+    python3 benchmarks/bench_parsers.py --corpus saved_pages/
+    python3 benchmarks/bench_parsers.py --generate 200   # synthetic corpus
+"""
+import os
+import sys
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import html_parsers
+from html_parsers import parse_document
+
+BACKENDS = ['html.parser', 'lxml', 'stream']
+
+
+def generate_corpus(directory, count, seed=42):
+    """Write count synthetic pages with nested markup, links, images and contact text"""
+    rng = random.Random(seed)
+    for i in range(count):
+        blocks = []
+        for j in range(rng.randint(50, 400)):
+            blocks.append(
+                f'<div class="block b{j}"><p>Paragraph {j} lorem ipsum dolor sit amet '
+                f'<a href="/page{rng.randint(0, count)}.html">link</a> '
+                f'<img src="/img/{rng.randint(0, 999)}.png" alt="">'
+                f'<span>contact{j}@example.com &amp; (555) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}</span>'
+                f'</p></div>')
+        page = (f'<!DOCTYPE html><html><head><title>Page {i}</title>'
+                f'<style>.block {{ margin: 0 }}</style><script>var page = {i};</script></head>'
+                f'<body>{"".join(blocks)}</body></html>')
+        with open(os.path.join(directory, f'page{i}.html'), 'w', encoding='utf-8') as f:
+            f.write(page)
+
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+
+def run(pages, backend):
+    for html in pages:
+        document = parse_document(html, backend)
+        len(document.links), len(document.images)
+        for _ in document.strings():
+            pass
+
+
+def measure(pages, backend, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(pages, backend)
+        best = min(best, time.perf_counter() - start)
+
+    peak = 0
+    for html in pages[:20]:
+        tracemalloc.start()
+        run([html], backend)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return len(pages) / best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML parser backends')
+    parser.add_argument('--corpus', help='Directory of saved .html files')
+    parser.add_argument('--generate', type=int, default=100, help='Synthetic pages to generate when no corpus is given (default: 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend; the best is kept (default: 3)')
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_corpus(directory, args.generate)
+            pages = load_corpus(directory)
+    if not pages:
+        parser.error('the corpus contains no .html files')
+
+    megabytes = sum(len(html) for html in pages) / (1024 * 1024)
+    print(f"Corpus: {len(pages)} pages, {megabytes:.1f} MB")
+
+    variants = [(backend, backend) for backend in BACKENDS if backend != 'lxml' or html_parsers.lxml_etree() is not None]
+    if html_parsers.lxml_etree() is not None:
+        variants.append(('stream (stdlib)', 'stream'))
+
+    for label, backend in variants:
+        saved_etree = html_parsers.etree
+        if label == 'stream (stdlib)':
+            html_parsers.etree = None
+        try:
+            pages_per_second, peak = measure(pages, backend, args.repeat)
+        finally:
+            html_parsers.etree = saved_etree
+        print(f"{label:<16} {pages_per_second:9.1f} pages/s  peak {peak / (1024 * 1024):7.2f} MB/page")
+
+
+if __name__ == '__main__':
+    main()
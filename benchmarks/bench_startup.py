@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - Import time of the command line entry points
+by abderrafie
+
+Runs each tool with --help under python -X importtime and reports the
+time spent importing modules (interpreter startup excluded) and the
+wall time of the whole run. Heavy dependencies such as requests, bs4
+and asyncio must only be imported once a crawl starts; a --help run
+that imports one of them fails the check.
+
+    python3 benchmarks/bench_startup.py --save-baseline startup.json
+    python3 benchmarks/bench_startup.py --baseline startup.json   # exits 1 on a regression
+"""
+import os
+import sys
+import argparse
+import json
+import subprocess
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ['spider.py', 'email_phone_extractor.py', 'main_interface.py']
+HEAVY_MODULES = ['requests', 'urllib3', 'bs4', 'lxml', 'asyncio', 'multiprocessing',
+                 'concurrent.futures', 'http.server', 'urllib.robotparser']
+
+
+def import_times(command):
+    """Run command under -X importtime; returns ({top-level module: cumulative us}, all module names, seconds)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    top_level, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules, elapsed
+
+
+def measure(script, startup, repeat):
+    """Best of repeat --help runs of script"""
+    best = None
+    for _ in range(repeat):
+        top_level, modules, elapsed = import_times([script, '--help'])
+        imports = {name: us for name, us in top_level.items() if name not in startup}
+        result = {
+            'import_ms': sum(imports.values()) / 1000,
+            'wall_ms': elapsed * 1000,
+            'slowest': sorted(imports, key=imports.get, reverse=True)[:3],
+            'heavy': [name for name in HEAVY_MODULES if name in modules],
+        }
+        if best is None or result['wall_ms'] < best['wall_ms']:
+            best = result
+    return best
+
+
+def regressions(name, result, baseline, tolerance):
+    previous = baseline.get(name)
+    if previous is None:
+        return []
+    return [f"{key} {result[key]:.1f} > {previous[key]:.1f}" for key in ('import_ms', 'wall_ms')
+            if result[key] > previous[key] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the command line tools')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per tool; the fastest is kept (default: 5)')
+    parser.add_argument('--baseline', help='Compare with results saved by --save-baseline; exit 1 on a regression')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Save the results as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline (default: 0.25)')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    startup, _, bare = import_times(['-c', 'pass'])
+    print(f"Interpreter startup: {bare * 1000:.0f} ms")
+    results = {}
+    failed = False
+    for script in ENTRY_POINTS:
+        result = measure(script, startup, args.repeat)
+        results[script] = result
+        status = 'ok' if not result['heavy'] else 'IMPORTS ' + ', '.join(result['heavy'])
+        print(f"{script:<26} imports {result['import_ms']:7.1f} ms  wall {result['wall_ms']:7.1f} ms  "
+              f"slowest: {', '.join(result['slowest'])}  {status}")
+        worse = regressions(script, result, baseline, args.tolerance)
+        if worse:
+            print(f"{'':<26} REGRESSION vs baseline: {', '.join(worse)}")
+        failed = failed or bool(result['heavy'] or worse)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Parse worker scaling benchmark
+by abderrafie
+
+Serves a synthetic site from a local HTTP server and crawls it with the
+image and contact extractors, parsing in threads (--workers 0) and then
+in 1..N worker processes, and reports pages/s for each setting. Every
+process run must find the same pages and contacts as the threaded run,
+or the script exits 1.
+
+    python3 benchmarks/bench_workers.py --pages 300 --max-workers 4
+"""
+import os
+import sys
+import argparse
+import functools
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_parsers import generate_corpus
+from crawl_engine import CrawlEngine, ImageExtractor
+from email_phone_extractor import EmailPhoneExtractor
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    """Start a threaded HTTP server for directory on a free port; returns it"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(url, workers, concurrency):
+    engine = CrawlEngine([ImageExtractor(), EmailPhoneExtractor()], concurrency=concurrency,
+                         per_host=concurrency, workers=workers)
+    start = time.perf_counter()
+    pages = contacts = 0
+    for page in engine.crawl(url, 2):
+        pages += 1
+        if not page.error:
+            contacts += sum(len(found) for found in page.results['contacts'])
+    return pages, contacts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawl throughput with parse worker processes')
+    parser.add_argument('--pages', type=int, default=200, help='Synthetic pages to serve (default: 200)')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1,
+                        help='Largest worker process count to try (default: CPU count)')
+    parser.add_argument('-j', '--concurrency', type=int, default=8, help='Concurrent fetches (default: 8)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_corpus(directory, args.pages)
+        links = ''.join(f'<a href="page{i}.html">{i}</a>' for i in range(args.pages))
+        with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(f'<html><body>{links}</body></html>')
+
+        server = serve(directory)
+        url = f'http://127.0.0.1:{server.server_address[1]}/index.html'
+        print(f"Site: {args.pages + 1} pages, {os.cpu_count()} CPUs, concurrency {args.concurrency}")
+        failed = False
+        try:
+            baseline = expected = None
+            for workers in range(args.max_workers + 1):
+                pages, contacts, elapsed = crawl(url, workers, args.concurrency)
+                rate = pages / elapsed
+                baseline = baseline or rate
+                expected = expected or (pages, contacts)
+                status = 'ok' if (pages, contacts) == expected else \
+                    f'WRONG: threads found {expected[1]} contacts on {expected[0]} pages'
+                failed = failed or status != 'ok'
+                label = 'threads' if workers == 0 else f'{workers} process{"es" if workers > 1 else ""}'
+                print(f"{label:<12} {rate:8.1f} pages/s  x{rate / baseline:.2f}  ({contacts} contacts)  {status}")
+        finally:
+            server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Fixture site - Deterministic synthetic website served from memory
+by abderrafie
+
+Page 0 is served at / and page i at /page/i.html. Each page links to
+its fanout children (a tree), optionally back to its parent and the
+home page (cycles), to the same child with a #fragment, and to an
+external host that must not be followed. /sitemap.xml lists every
+page, most recently modified first. Pages embed images, emails
+and phone numbers numbered after the page, so the exact sets a crawl
+of a given depth must find are known in advance.
+"""
+import functools
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_PADDING = ('<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod '
+                'tempor incididunt ut labore et dolore magna aliqua.</p>')
+
+
+class FixtureSite:
+    def __init__(self, pages=200, fanout=4, cycles=True, images=3, image_size=16 * 1024,
+                 contacts=2, padding=20, latency=0.0):
+        self.pages = pages
+        self.fanout = fanout
+        self.cycles = cycles
+        self.images = images
+        self.image_size = image_size
+        self.contacts = contacts
+        self.padding = padding
+        self.latency = latency
+
+    def page_path(self, i):
+        return '/' if i == 0 else f'/page/{i}.html'
+
+    def children(self, i):
+        return [child for child in range(i * self.fanout + 1, i * self.fanout + self.fanout + 1)
+                if child < self.pages]
+
+    def emails(self, i):
+        return [f'contact{i}.{k}@site{i % 7}.example.com' for k in range(self.contacts)]
+
+    def phones(self, i):
+        """(as written on the page, as the extractor must report it)"""
+        numbers = []
+        for k in range(self.contacts):
+            area, line = 200 + i % 800, (i * 7 + k) % 10000
+            numbers.append((f'+1 (555) {area:03d}-{line:04d}', f'+1555{area:03d}{line:04d}'))
+        return numbers
+
+    def image_paths(self, i):
+        return [f'/img/{i}-{k}.png' for k in range(self.images)]
+
+    def render(self, i):
+        links = [self.page_path(child) for child in self.children(i)]
+        if self.children(i):
+            links.append(self.page_path(self.children(i)[0]) + '#top')
+        if self.cycles and i:
+            links += ['/', self.page_path((i - 1) // self.fanout)]
+        links.append('https://external.example.org/')
+        body = [f'<h1>Page {i}</h1>']
+        body += [f'<a href="{link}">link</a>' for link in links]
+        body += [f'<img src="{path}" alt="">' for path in self.image_paths(i)]
+        body += [f'<p>Write to <a href="mailto:{email}">{email}</a></p>' for email in self.emails(i)]
+        body += [f'<p>Call {written}</p>' for written, _ in self.phones(i)]
+        body += [PAGE_PADDING] * self.padding
+        return (f'<!DOCTYPE html><html><head><title>Page {i}</title><script>var page = {i};</script>'
+                f'</head><body>{"".join(body)}</body></html>').encode('utf-8')
+
+    def sitemap(self, base_url):
+        entries = ''.join(f'<url><loc>{base_url}{self.page_path(i)}</loc>'
+                          f'<lastmod>2024-01-{1 + i % 28:02d}</lastmod></url>' for i in range(self.pages))
+        return (f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'{entries}</urlset>').encode('utf-8')
+
+    def image(self, path):
+        """A valid PNG of about image_size bytes, unique to path"""
+        raw = b'\x00' + path.encode('ascii').ljust(max(16, self.image_size - 80), b'\x00')
+        width = len(raw) - 1
+
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, 1, 8, 0, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(raw, 0)) + chunk(b'IEND', b''))
+
+    def expected(self, max_depth, sitemap=False):
+        """Pages, image URLs, emails and phones a crawl from / down to max_depth must find"""
+        pages, images, emails, phones = set(), set(), set(), set()
+        level = [0]
+        for _ in range(max_depth):
+            pages.update(level)
+            level = [child for i in level for child in self.children(i) if child not in pages]
+        if sitemap:
+            pages.update(range(self.pages))
+        for i in pages:
+            images.update(self.image_paths(i))
+            emails.update(self.emails(i))
+            phones.update(normalized for _, normalized in self.phones(i))
+        return {'pages': pages, 'images': images, 'emails': emails, 'phones': phones}
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Start a threaded server for the site in a background thread; returns it"""
+        server = ThreadingHTTPServer((host, port), functools.partial(FixtureHandler, self))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real server
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def __init__(self, site, *args, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.site.latency:
+            time.sleep(self.site.latency)
+        path = self.path.split('?')[0]
+        if path == '/' or (path.startswith('/page/') and path.endswith('.html')):
+            number = path[len('/page/'):-len('.html')] if path != '/' else '0'
+            if number.isdigit() and int(number) < self.site.pages:
+                return self._send(self.site.render(int(number)), 'text/html; charset=utf-8')
+        elif path == '/sitemap.xml':
+            host = self.headers.get('Host', '%s:%d' % self.server.server_address[:2])
+            return self._send(self.site.sitemap(f'http://{host}'), 'application/xml')
+        elif path.startswith('/img/') and path.endswith('.png'):
+            return self._send(self.site.image(path), 'image/png')
+        self._send(b'Not found', 'text/plain', 404)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Crawler benchmark suite
+by abderrafie
+
+Serves a synthetic site (see fixture_site.py) from a local HTTP server
+and runs spider.spider() and EmailPhoneExtractor.extract_from_url()
+against it in several configurations. Each scenario runs in a fresh
+process and reports pages/s, images/s, MB/s, peak RSS and whether the
+exact expected images, emails and phones were found. A scenario that
+crashes or runs past --timeout counts as failed, and the script exits 1.
+
+    python3 benchmarks/run_benchmarks.py --save-baseline baseline.json
+    python3 benchmarks/run_benchmarks.py --baseline baseline.json   # exits 1 on a regression
+
+Peak RSS is that of the scenario process; parse worker processes are
+not included.
+"""
+import os
+import sys
+import argparse
+import contextlib
+import json
+import multiprocessing
+import queue
+import resource
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixture_site import FixtureSite
+
+# name -> (tool, crawl options)
+SCENARIOS = {
+    'spider-serial': ('spider', {}),
+    'spider-concurrent': ('spider', {'concurrency': 8, 'per_host': 8}),
+    'extractor-serial': ('extractor', {}),
+    'extractor-concurrent': ('extractor', {'concurrency': 8, 'per_host': 8}),
+    'extractor-processes': ('extractor', {'concurrency': 8, 'per_host': 8, 'workers': 2}),
+    'extractor-sitemap': ('extractor', {'concurrency': 8, 'per_host': 8, 'sitemap': True}),
+    'extractor-disk-frontier': ('extractor', {'concurrency': 8, 'per_host': 8, 'disk_frontier': True}),
+}
+RATES = ['pages_per_s', 'images_per_s', 'mb_per_s']
+
+
+def run_scenario(tool, options, base_url, depth, expected, results):
+    """Run one scenario; meant to be the target of a fresh process"""
+    import spider
+    from downloader import DownloadPool, MANIFEST_NAME
+    from email_phone_extractor import EmailPhoneExtractor
+    from http_client import HttpClient
+    from metrics import Metrics
+    from sitemaps import Sitemaps
+
+    metrics = Metrics()
+    client = HttpClient(pool_size=16, metrics=metrics)
+    if options.pop('sitemap', False):
+        options['sitemaps'] = Sitemaps(client)
+    problems = []
+    with tempfile.TemporaryDirectory() as path, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        if options.pop('disk_frontier', False):
+            options['frontier_dir'] = path
+        start = time.perf_counter()
+        if tool == 'spider':
+            with DownloadPool(path, workers=8, client=client) as pool:
+                spider.spider(base_url + '/', True, depth, path, pool=pool, client=client, **options)
+            elapsed = time.perf_counter() - start
+            with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+                found = {json.loads(line)['url'][len(base_url):] for line in f}
+            problems += compare('images', found, expected['images'])
+        else:
+            emails, phones = EmailPhoneExtractor().extract_from_url(base_url + '/', True, depth, path,
+                                                                     client=client, **options)
+            elapsed = time.perf_counter() - start
+            problems += compare('emails', emails, expected['emails'])
+            problems += compare('phones', phones, expected['phones'])
+
+    counters = metrics.snapshot()['counters']
+    if counters.get('pages', 0) != len(expected['pages']):
+        problems.append(f"crawled {counters.get('pages', 0)} pages, expected {len(expected['pages'])}")
+    megabytes = (counters.get('bytes', 0) + counters.get('image_bytes', 0)) / (1024 * 1024)
+    results.put({
+        'seconds': elapsed,
+        'pages_per_s': counters.get('pages', 0) / elapsed,
+        'images_per_s': counters.get('images', 0) / elapsed,
+        'mb_per_s': megabytes / elapsed,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'problems': problems,
+    })
+
+
+def compare(label, found, expected):
+    problems = []
+    if expected - found:
+        problems.append(f'{len(expected - found)} {label} missing')
+    if found - expected:
+        problems.append(f'{len(found - expected)} unexpected {label}')
+    return problems
+
+
+def run_in_process(tool, options, base_url, depth, expected, timeout):
+    """Run one scenario in a new process; a crash or a timeout comes back as a problem"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_scenario, args=(tool, options, base_url, depth, expected, results))
+    process.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None and time.monotonic() < deadline:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    result = results.get(timeout=1)  # put just before exiting
+                except queue.Empty:
+                    break
+    problem = None
+    if result is None and process.is_alive():
+        process.terminate()
+        problem = f'timed out after {timeout:.0f}s'
+    process.join()
+    if result is None:
+        problem = problem or f'crashed with exit code {process.exitcode}'
+        return {'seconds': 0.0, 'pages_per_s': 0.0, 'images_per_s': 0.0, 'mb_per_s': 0.0, 'rss_mb': 0.0,
+                'problems': [problem]}
+    return result
+
+
+def measure(name, base_url, depth, site, repeat, timeout):
+    """Best of repeat runs of a scenario, each in a new process; a failed run is returned as is"""
+    tool, options = SCENARIOS[name]
+    expected = site.expected(depth, options.get('sitemap', False))
+    best = None
+    for _ in range(repeat):
+        result = run_in_process(tool, options, base_url, depth, expected, timeout)
+        if result['problems']:
+            return result
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def regressions(name, result, baseline, tolerance):
+    """Describe the metrics of result that are worse than baseline by more than tolerance"""
+    previous = baseline.get(name)
+    if previous is None:
+        return []
+    found = []
+    for key in RATES:
+        if previous.get(key) and result[key] < previous[key] * (1 - tolerance):
+            found.append(f'{key} {result[key]:.1f} < {previous[key]:.1f}')
+    if previous.get('rss_mb') and result['rss_mb'] > previous['rss_mb'] * (1 + tolerance):
+        found.append(f"rss_mb {result['rss_mb']:.1f} > {previous['rss_mb']:.1f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the crawlers against a local synthetic site')
+    parser.add_argument('--pages', type=int, default=200, help='Pages on the site (default: 200)')
+    parser.add_argument('--fanout', type=int, default=4, help='Child links per page (default: 4)')
+    parser.add_argument('--no-cycles', action='store_true', help='Do not link pages back to their parent and the home page')
+    parser.add_argument('--images', type=int, default=3, help='Images per page (default: 3)')
+    parser.add_argument('--image-kb', type=int, default=16, help='Size of each image in KB (default: 16)')
+    parser.add_argument('--contacts', type=int, default=2, help='Emails and phone numbers per page (default: 2)')
+    parser.add_argument('--latency', type=float, default=0, help='Server delay per request in ms (default: 0)')
+    parser.add_argument('-l', '--depth', type=int, default=5, help='Crawl depth (default: 5)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run; repeat to run several (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario; the fastest is kept (default: 1)')
+    parser.add_argument('--timeout', type=float, default=600,
+                        help='Seconds a scenario run may take before it counts as failed (default: 600)')
+    parser.add_argument('--baseline', help='Compare with results saved by --save-baseline; exit 1 on a regression')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Save the results as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed slowdown or RSS growth against the baseline (default: 0.15)')
+    args = parser.parse_args()
+
+    site = FixtureSite(args.pages, args.fanout, not args.no_cycles, args.images, args.image_kb * 1024,
+                       args.contacts, latency=args.latency / 1000)
+    expected = site.expected(args.depth)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    server = site.serve()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    print(f"Site: {args.pages} pages (fan-out {args.fanout}), {len(expected['pages'])} within depth {args.depth}, "
+          f"{args.images} x {args.image_kb} KB images and {args.contacts} emails/phones per page")
+
+    results = {}
+    failed = False
+    try:
+        for name in args.scenario or SCENARIOS:
+            result = measure(name, base_url, args.depth, site, args.repeat, args.timeout)
+            results[name] = result
+            status = 'ok' if not result['problems'] else 'WRONG: ' + ', '.join(result['problems'])
+            print(f"{name:<23} {result['pages_per_s']:8.1f} pages/s {result['images_per_s']:8.1f} images/s "
+                  f"{result['mb_per_s']:7.2f} MB/s  RSS {result['rss_mb']:6.1f} MB  {status}")
+            worse = regressions(name, result, baseline, args.tolerance)
+            if worse:
+                print(f"{'':<23} REGRESSION vs baseline: {', '.join(worse)}")
+            failed = failed or bool(result['problems'] or worse)
+    finally:
+        server.shutdown()
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'site': vars(args), 'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
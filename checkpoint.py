@@ -0,0 +1,87 @@
+"""
+Checkpoint - Resumable crawl state in SQLite
+by abderrafie
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class Checkpoint:
+    """Crawl frontier, visited set and partial results stored in the output directory.
+
+    Writes are committed every interval seconds, so an interrupted run
+    loses at most that much progress. Opening with resume=False clears
+    any previous state. Each tool keeps its own state file, named after it.
+    """
+    def __init__(self, path, name, resume=False, interval=5.0):
+        self.path = os.path.join(path, f'.{name}_state.sqlite')
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.last_commit = time.monotonic()
+        with self.lock:
+            self.db.execute('CREATE TABLE IF NOT EXISTS urls '
+                            '(url TEXT PRIMARY KEY, depth INTEGER, done INTEGER DEFAULT 0)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                            '(kind TEXT, value TEXT, PRIMARY KEY (kind, value))')
+            if not resume:
+                self.db.execute('DELETE FROM urls')
+                self.db.execute('DELETE FROM results')
+            self.db.commit()
+
+    def admit(self, url, depth):
+        """Record a URL entering the frontier"""
+        with self.lock:
+            self.db.execute('INSERT OR IGNORE INTO urls (url, depth) VALUES (?, ?)', (url, depth))
+            self._maybe_commit()
+
+    def complete(self, url):
+        """Record that a URL has been fetched and its results handled"""
+        with self.lock:
+            self.db.execute('UPDATE urls SET done = 1 WHERE url = ?', (url,))
+            self._maybe_commit()
+
+    def add_results(self, kind, values):
+        with self.lock:
+            self.db.executemany('INSERT OR IGNORE INTO results (kind, value) VALUES (?, ?)',
+                                ((kind, value) for value in values))
+            self._maybe_commit()
+
+    def results(self, kind):
+        with self.lock:
+            return {value for value, in self.db.execute('SELECT value FROM results WHERE kind = ?', (kind,))}
+
+    def seen_urls(self):
+        for url, in self._rows('SELECT url FROM urls'):
+            yield url
+
+    def pending(self):
+        """URLs admitted but not completed, in breadth-first order"""
+        return self._rows('SELECT url, depth FROM urls WHERE done = 0 ORDER BY depth, rowid')
+
+    def _rows(self, query, batch=10000):
+        """Yield the rows of query a batch at a time, so a huge crawl state is never loaded at once"""
+        with self.lock:
+            cursor = self.db.execute(query)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            yield from rows
+
+    def _maybe_commit(self):
+        if time.monotonic() - self.last_commit >= self.interval:
+            self.db.commit()
+            self.last_commit = time.monotonic()
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+            self.last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.db.close()
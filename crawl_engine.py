@@ -0,0 +1,417 @@
+"""
+Crawl Engine - Shared single-fetch crawler
+by abderrafie
+
+Every page is downloaded once and parsed once; the parsed page is then
+handed to pluggable extractors (images, links, contacts, ...).
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urljoin, urlparse
+from assets import css_urls, parse_srcset, pick_candidate
+from frontier import DiskQueue, Frontier, canonicalize_url
+from http_client import HttpClient, read_text
+from html_parsers import parse_document, resolve_parser
+from metrics import Metrics
+from sitemaps import recency_priority
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.avif', '.svg']
+# Links with these extensions are never fetched as pages
+NON_HTML_EXTENSIONS = tuple(IMAGE_EXTENSIONS) + (
+    '.ico', '.tif', '.tiff', '.pdf', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z',
+    '.rar', '.tar', '.exe', '.msi', '.dmg', '.iso', '.apk', '.deb', '.rpm', '.bin', '.mp3', '.wav',
+    '.ogg', '.flac', '.mp4', '.m4v', '.avi', '.mov', '.mkv', '.webm', '.wmv', '.doc', '.docx',
+    '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.css', '.js', '.woff', '.woff2', '.ttf', '.eot')
+DEFAULT_MAX_PAGE_SIZE = 5 * 1024 * 1024
+
+
+def is_valid_image(url):
+    if any(url.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
+        return True
+    parsed_url = urlparse(url)
+    path = parsed_url.path.lower()
+    if any(path.endswith(ext) for ext in IMAGE_EXTENSIONS):
+        return True
+    return False
+
+
+def is_html_content_type(content_type):
+    """True for content types worth parsing as a page; a missing header is given the benefit of the doubt"""
+    content_type = content_type.split(';')[0].strip().lower()
+    return not content_type or content_type.startswith('text/') or 'xhtml' in content_type
+
+
+def looks_like_html(url):
+    """False for links whose extension shows they are not pages"""
+    return not urlparse(url).path.lower().endswith(NON_HTML_EXTENSIONS)
+
+
+class SkippedPage(Exception):
+    """Raised when a URL is not fetched as a page, e.g. because it is not HTML"""
+
+
+class Page:
+    """A fetched page shared by all extractors"""
+    def __init__(self, url, depth, text=None, error=None, parser='stream', response=None,
+                 truncated=False):
+        self.url = url
+        self.depth = depth
+        self.text = text
+        self.response = response
+        self.truncated = truncated
+        self.error = error
+        self.parser = parser
+        self.results = {}
+        self.timings = {}  # stage -> seconds spent on this page, see Metrics
+        self.links = set()
+        self._document = None
+
+    @property
+    def document(self):
+        """Links, images and text of the page, parsed on first access only"""
+        if self._document is None:
+            start = time.perf_counter()
+            self._document = parse_document(self.text, self.parser)
+            self.timings['parse'] = time.perf_counter() - start
+        return self._document
+
+
+def is_image_candidate(url):
+    """True for an http(s) URL declared as an image: a known image extension, or no extension at all"""
+    parsed_url = urlparse(url)
+    if parsed_url.scheme not in ('http', 'https'):
+        return False
+    return is_valid_image(url) or '.' not in parsed_url.path.rsplit('/', 1)[-1]
+
+
+class ImageExtractor:
+    """Collect image URLs from <img> and <picture>, lazy-loading attributes and CSS url()
+
+    One rendition is kept per image: the srcset candidate that best
+    matches image_size ('largest', 'smallest' or a target width in
+    pixels), with the src as its 1x candidate. CSS url() values are kept
+    when they have an image extension.
+    """
+    name = 'images'
+
+    def __init__(self, image_size='largest'):
+        self.image_size = image_size
+
+    def extract(self, page):
+        images = []
+        for sources, srcsets in page.document.images:
+            candidates = [(url, width, density) for srcset in srcsets
+                          for url, width, density in parse_srcset(srcset)]
+            candidates = [(urljoin(page.url, url), width, density) for url, width, density in candidates]
+            fallback = next((urljoin(page.url, src) for src in sources
+                             if is_image_candidate(urljoin(page.url, src))), None)
+            if fallback is not None and not any(density == 1 for _, _, density in candidates):
+                candidates.append((fallback, None, 1.0))
+            best = pick_candidate([candidate for candidate in candidates if is_image_candidate(candidate[0])],
+                                  self.image_size)
+            if best is not None:
+                images.append(best[0])
+        for css in page.document.styles:
+            for url in css_urls(css):
+                img_url = urljoin(page.url, url)
+                if is_valid_image(img_url):
+                    images.append(img_url)
+        return list(dict.fromkeys(images))
+
+
+class LinkExtractor:
+    """Collect all links that belong to the same domain as the page"""
+    name = 'links'
+
+    def extract(self, page):
+        base_domain = urlparse(canonicalize_url(page.url))
+        links = set()
+        for href in page.document.links:
+            absolute_url = canonicalize_url(urljoin(page.url, href))
+            parsed_url = urlparse(absolute_url)
+            if parsed_url.netloc == base_domain.netloc:
+                links.add(absolute_url)
+        return links
+
+
+# Extractors and parser of a process-pool worker, set once by _init_worker
+_worker_state = {}
+
+
+def _init_worker(extractors, parser):
+    _worker_state['extractors'] = extractors
+    _worker_state['link_extractor'] = LinkExtractor()
+    _worker_state['parser'] = parser
+
+
+def _extract_in_worker(url, depth, text, follow):
+    """Parse a page in a worker process; only the extracted results and links are sent back"""
+    page = Page(url, depth, text, parser=_worker_state['parser'])
+    run_extractors(page, _worker_state['extractors'], _worker_state['link_extractor'], follow)
+    return page.results, page.links, page.timings
+
+
+def run_extractors(page, extractors, link_extractor, follow=False):
+    """Run every extractor on page, timing each one apart from the parse it triggers"""
+    for extractor in (extractors + [link_extractor]) if follow else extractors:
+        start = time.perf_counter()
+        parsed = page.timings.get('parse', 0)
+        result = extractor.extract(page)
+        elapsed = time.perf_counter() - start - (page.timings.get('parse', 0) - parsed)
+        page.timings[f'extract.{extractor.name}'] = elapsed
+        if extractor is link_extractor:
+            page.links = result
+        else:
+            page.results[extractor.name] = result
+    return page
+
+
+class CrawlEngine:
+    """Crawl pages and run extractors on each one.
+
+    With concurrency > 1 pages are fetched concurrently from an asyncio
+    event loop, at most per_host at a time for any single host; parsing
+    and extraction run in a separate worker pool off the event loop.
+    All fetches share one pooled HttpClient. With a Checkpoint the crawl
+    state is persisted and a resumed crawl skips completed URLs.
+
+    Pages are streamed: responses that are not HTML are dropped as soon as
+    their headers arrive, and bodies are decoded incrementally and cut off
+    after max_page_size bytes. Links whose extension marks them as
+    binaries are never queued.
+
+    With workers > 0 parsing and extraction run in a pool of that many
+    processes instead of threads, so they scale past the GIL. Only the
+    page text goes to a worker, and only the extracted results and links
+    come back. Extractors must then be picklable.
+
+    With a Politeness, URLs disallowed by robots.txt are skipped and each
+    host is paced; while one host cools down, other hosts are crawled.
+
+    With a Sitemaps, the pages listed in each seed's sitemaps are queued
+    next to the seed, most recently modified first, so deep pages are
+    reached without crawling down to them.
+
+    The frontier is kept in memory, or with frontier_dir in a temporary
+    SQLite file in that directory, so memory stays flat on crawls that
+    discover millions of URLs.
+
+    Pages, bytes, errors and per-stage timings are recorded in metrics,
+    which defaults to the client's Metrics.
+    """
+    def __init__(self, extractors, timeout=10, link_filter=None, sort_query=False,
+                 concurrency=1, per_host=2, parse_workers=None, client=None, checkpoint=None,
+                 parser='auto', max_page_size=DEFAULT_MAX_PAGE_SIZE, workers=0,
+                 politeness=None, metrics=None, sitemaps=None, frontier_dir=None):
+        self.extractors = list(extractors)
+        self.link_extractor = LinkExtractor()
+        self.client = client or HttpClient(timeout=timeout)
+        self.timeout = timeout
+        self.link_filter = link_filter
+        self.sort_query = sort_query
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.parse_workers = parse_workers or min(self.concurrency, 4)
+        self.checkpoint = checkpoint
+        self.parser = resolve_parser(parser)
+        self.max_page_size = max_page_size
+        self.workers = max(0, workers)
+        self.politeness = politeness
+        self.metrics = metrics or self.client.metrics or Metrics()
+        self.sitemaps = sitemaps
+        self.frontier_dir = frontier_dir
+
+    def fetch(self, url):
+        """Fetch url as a page; returns (response, text, truncated)"""
+        if self.politeness is not None and not self.politeness.allowed(url):
+            raise SkippedPage('Disallowed by robots.txt')
+        response = self.client.get(url, stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '')
+            if not is_html_content_type(content_type):
+                raise SkippedPage(f"Skipped non-HTML content ({content_type.split(';')[0]})")
+        except Exception:
+            response.close()
+            raise
+        with self.metrics.time('download'):
+            text, size, truncated = read_text(response, self.max_page_size)
+        self.metrics.count('bytes', size)
+        return response, text, truncated
+
+    def analyze(self, url, depth, fetched, follow=False):
+        """Parse a fetched page and run every extractor on it"""
+        response, text, truncated = fetched
+        page = Page(url, depth, text, parser=self.parser, response=response, truncated=truncated)
+        return run_extractors(page, self.extractors, self.link_extractor, follow)
+
+    def process(self, url, depth=1, follow=False):
+        """Fetch and parse a single URL, then run every extractor on it"""
+        try:
+            return self.analyze(url, depth, self.fetch(url), follow)
+        except Exception as e:
+            return Page(url, depth, error=e)
+
+    def crawl(self, urls, max_depth=1):
+        """Yield processed pages breadth-first, following same-domain links up to max_depth.
+
+        urls is a single seed URL or a list of them; all seeds share one
+        frontier, which takes turns between hosts. Every canonical URL is
+        fetched at most once per crawl. A page is marked complete in the
+        checkpoint once the caller has handled it.
+        """
+        queue = DiskQueue(self.frontier_dir) if self.frontier_dir is not None else None
+        with Frontier(max_depth, self.sort_query, self.checkpoint, self.politeness, queue) as frontier:
+            seeds = [urls] if isinstance(urls, str) else list(urls)
+            for url in seeds:
+                frontier.add(url, 1)
+            if self.sitemaps is not None:
+                for seed in seeds:
+                    for url, lastmod in self.sitemaps.urls(seed):
+                        if self._enqueue(frontier, url, 1, recency_priority(lastmod)):
+                            self.metrics.count('sitemap_urls')
+
+            if self.concurrency > 1 or self.workers:
+                pages = self._crawl_concurrent(frontier)
+            else:
+                pages = self._crawl_serial(frontier)
+            try:
+                for page in pages:
+                    self._record(page)
+                    yield page
+                    if self.checkpoint is not None:
+                        self.checkpoint.complete(page.url)
+            finally:
+                pages.close()
+                if self.checkpoint is not None:
+                    self.checkpoint.commit()
+
+    def _record(self, page):
+        self.metrics.merge(page.timings)
+        if isinstance(page.error, SkippedPage):
+            self.metrics.count('skipped')
+        elif page.error is not None:
+            status = getattr(getattr(page.error, 'response', None), 'status_code', None)
+            self.metrics.count(f'errors.HTTP {status}' if status else f'errors.{type(page.error).__name__}')
+        else:
+            self.metrics.count('pages')
+            if page.truncated:
+                self.metrics.count('pages_truncated')
+
+    def _crawl_serial(self, frontier):
+        while frontier:
+            item = frontier.pop()
+            if item is None:
+                time.sleep(frontier.wait())
+                continue
+            url, depth = item
+            page = self.process(url, depth, follow=depth < frontier.max_depth)
+            self._enqueue_links(frontier, page)
+            yield page
+
+    def _enqueue_links(self, frontier, page):
+        for link in page.links:
+            self._enqueue(frontier, link, page.depth + 1)
+
+    def _enqueue(self, frontier, link, depth, priority=0):
+        if not looks_like_html(link) or (self.link_filter is not None and not self.link_filter(link)):
+            return False
+        if self.politeness is not None and self.politeness.disallowed(link):
+            return False
+        return frontier.add(link, depth, priority)
+
+    def _crawl_concurrent(self, frontier):
+        """Run the async crawl in a background thread and yield its pages"""
+        import asyncio
+        pages = queue.Queue()
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self._crawl_async(frontier, pages, stop)),
+            daemon=True)
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            stop.set()
+            thread.join()
+
+    async def _crawl_async(self, frontier, pages, stop):
+        import asyncio
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        max_depth = frontier.max_depth
+        limit = asyncio.Semaphore(self.concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        fetch_pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='fetch')
+        if self.workers:
+            # spawn rather than fork: this runs in a background thread of a threaded process
+            parse_pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker,
+                                             initargs=(self.extractors, self.parser))
+        else:
+            parse_pool = ThreadPoolExecutor(self.parse_workers, thread_name_prefix='parse')
+        in_flight = max(self.concurrency, self.workers) * 2
+        pending = set()
+
+        async def parse(url, depth, fetched, follow):
+            loop = asyncio.get_running_loop()
+            if not self.workers:
+                return await loop.run_in_executor(parse_pool, self.analyze, url, depth, fetched, follow)
+            response, text, truncated = fetched
+            results, links, timings = await loop.run_in_executor(parse_pool, _extract_in_worker,
+                                                                  url, depth, text, follow)
+            page = Page(url, depth, parser=self.parser, response=response, truncated=truncated)
+            page.results, page.links, page.timings = results, links, timings
+            return page
+
+        async def fetch(url):
+            # The politeness token is taken right before the request, once both limits are held;
+            # a host that is cooling down is waited for without holding the global limit
+            loop = asyncio.get_running_loop()
+            host = urlparse(url).netloc
+            async with host_limits[host]:
+                while True:
+                    if self.politeness is not None:
+                        await asyncio.sleep(self.politeness.delay(host))
+                    async with limit:
+                        if self.politeness is None or self.politeness.acquire(host):
+                            return await loop.run_in_executor(fetch_pool, self.fetch, url)
+
+        async def visit(url, depth):
+            try:
+                fetched = await fetch(url)
+                return await parse(url, depth, fetched, depth < max_depth)
+            except Exception as e:
+                return Page(url, depth, error=e)
+
+        try:
+            while (frontier or pending) and not stop.is_set():
+                while frontier and len(pending) < in_flight:
+                    item = frontier.pop(reserve=False)
+                    if item is None:
+                        break  # every queued host is cooling down
+                    pending.add(asyncio.ensure_future(visit(*item)))
+
+                # Wake up when a task finishes or, if there is room, when a host is due
+                timeout = frontier.wait() if frontier and len(pending) < in_flight else None
+                if not pending:
+                    await asyncio.sleep(timeout)
+                    continue
+                done, pending = await asyncio.wait(pending, timeout=timeout,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = task.result()
+                    pages.put(page)
+                    self._enqueue_links(frontier, page)
+        finally:
+            for task in pending:
+                task.cancel()
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool.shutdown(wait=bool(self.workers), cancel_futures=True)
+            pages.put(None)
@@ -0,0 +1,258 @@
+"""
+Downloader - Parallel image download pool
+by abderrafie
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+from colorama import Fore, Style
+from crawl_engine import IMAGE_EXTENSIONS
+from http_client import HttpClient
+
+MANIFEST_NAME = 'manifest.jsonl'
+SKIPPED = -1  # download_file result for an image that is already stored
+OUTPUT_LOCK = threading.Lock()
+# File extension of each image media type; other image/* types use their subtype, or .img
+IMAGE_CONTENT_TYPES = {
+    'image/jpeg': '.jpg', 'image/pjpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif',
+    'image/bmp': '.bmp', 'image/x-ms-bmp': '.bmp', 'image/webp': '.webp', 'image/avif': '.avif',
+    'image/svg+xml': '.svg', 'image/x-icon': '.ico', 'image/vnd.microsoft.icon': '.ico', 'image/tiff': '.tif',
+}
+
+
+class ImageStore:
+    """Where each downloaded image lives in the output directory.
+
+    Every stored image is appended to manifest.jsonl (source URL, stored
+    file, SHA-256, size). The manifest is reloaded on the next run as a
+    known-URL index so those images are not downloaded again. With
+    dedup=True images are stored once under their content hash.
+    """
+    def __init__(self, path, dedup=False):
+        self.path = path
+        self.dedup = dedup
+        self.manifest_path = os.path.join(path, MANIFEST_NAME)
+        self.lock = threading.Lock()
+        self.urls = {}   # source URL -> stored filename
+        self.owners = {}  # stored filename -> source URL (non-dedup names)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted run
+                    self.urls[entry['url']] = entry['file']
+                    self.owners.setdefault(entry['file'], entry['url'])
+
+    def lookup(self, url):
+        """Return the stored filename for url if it was already downloaded"""
+        filename = self.urls.get(url)
+        if filename and os.path.exists(os.path.join(self.path, filename)):
+            return filename
+        return None
+
+    def claim(self, url, filename):
+        """Reserve a filename for url that no other image is using"""
+        with self.lock:
+            name = filename
+            owner = self.owners.get(name)
+            if owner != url and (owner is not None or os.path.exists(os.path.join(self.path, name))):
+                stem, ext = os.path.splitext(filename)
+                name = f"{stem}_{url_digest(url)[:8]}{ext}"
+            self.owners[name] = url
+            return name
+
+    def record(self, url, filename, digest, size):
+        with self.lock:
+            self.urls[url] = filename
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'url': url, 'file': filename, 'sha256': digest, 'size': size}) + '\n')
+
+
+def print_line(message):
+    """Print one line whole; download threads print while the crawl loop does"""
+    with OUTPUT_LOCK:
+        print(message)
+
+
+def url_digest(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def media_type(content_type):
+    """The lowercased media type of a Content-Type header, without its parameters"""
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+def image_extension(content_type):
+    """File extension for an image/* Content-Type, or None when it is not an image"""
+    kind = media_type(content_type)
+    if not kind.startswith('image/'):
+        return None
+    subtype = kind[len('image/'):]
+    return IMAGE_CONTENT_TYPES.get(kind, '.' + subtype if subtype.isalnum() else '.img')
+
+
+def image_filename(url, content_type):
+    """Pick a filename from the URL, or a stable one derived from it, with the extension of the content type"""
+    filename = os.path.basename(urlparse(url).path)
+    stem, url_ext = os.path.splitext(filename)
+    url_ext = url_ext.lower()
+    ext = image_extension(content_type) or url_ext
+    if url_ext in IMAGE_EXTENSIONS:
+        return filename if url_ext.replace('.jpeg', '.jpg') == ext else stem + ext
+    return f"image_{url_digest(url)[:12]}{ext}"
+
+
+def is_image_response(url, content_type):
+    """True for an image/* response, or one without a Content-Type whose URL has an image extension"""
+    if content_type:
+        return image_extension(content_type) is not None
+    return os.path.splitext(urlparse(url).path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def download_file(url, path, timeout=(5, 30), chunk_size=64 * 1024, client=None, store=None):
+    """Stream an image to path; returns the number of bytes written, SKIPPED or None on failure.
+
+    The body is hashed while it streams to a temporary file, which is then
+    moved into place under its final name. With client.metrics the time
+    spent writing to disk is recorded apart from the whole download.
+    """
+    client = client or HttpClient()
+    metrics = client.metrics
+    if store is not None:
+        known = store.lookup(url)
+        if known:
+            print_line(f"{Fore.BLUE}   ↷ {known} (already downloaded)")
+            return SKIPPED
+
+    started = time.perf_counter()
+    written = 0.0  # seconds spent in disk writes
+    try:
+        response = client.get(url, stream=True, timeout=timeout)
+        content_type = response.headers.get('content-type', '')
+        if response.status_code == 200 and not is_image_response(url, content_type):
+            print_line(f"{Fore.RED}   ✗ Skipped: not an image ({media_type(content_type) or 'no content type'})")
+            response.close()
+            if metrics is not None:
+                metrics.count('errors.not an image')
+        elif response.status_code == 200:
+            filename = image_filename(url, content_type)
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=path, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        write_start = time.perf_counter()
+                        f.write(chunk)
+                        written += time.perf_counter() - write_start
+                        digest.update(chunk)
+                        size += len(chunk)
+
+                if store is not None and store.dedup:
+                    filename = digest.hexdigest() + os.path.splitext(filename)[1].lower()
+                    if os.path.exists(os.path.join(path, filename)):
+                        os.remove(tmp_path)
+                        store.record(url, filename, digest.hexdigest(), size)
+                        print_line(f"{Fore.BLUE}   ↷ {filename} (duplicate content)")
+                        return SKIPPED
+                elif store is not None:
+                    filename = store.claim(url, filename)
+                os.replace(tmp_path, os.path.join(path, filename))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            if store is not None:
+                store.record(url, filename, digest.hexdigest(), size)
+            if metrics is not None:
+                metrics.observe('image_download', time.perf_counter() - started - written)
+                metrics.observe('disk_write', written)
+                metrics.count('images')
+                metrics.count('image_bytes', size)
+            print_line(f"{Fore.GREEN}   ✓ {Style.BRIGHT}{filename}")
+            return size
+        else:
+            print_line(f"{Fore.RED}   ✗ Failed: HTTP {response.status_code}")
+            response.close()
+            if metrics is not None:
+                metrics.count(f'errors.HTTP {response.status_code}')
+    except Exception as e:
+        print_line(f"{Fore.RED}   ✗ Error: {e}")
+        if metrics is not None:
+            metrics.count(f'errors.{type(e).__name__}')
+    return None
+
+
+class DownloadPool:
+    """Bounded pool of image downloads running alongside the page crawl.
+
+    Images already stored, by URL or with dedup by content, are counted
+    as skipped rather than downloaded.
+    """
+    def __init__(self, path, workers=4, connect_timeout=5, read_timeout=30, chunk_size=64 * 1024,
+                 client=None, dedup=False):
+        from concurrent.futures import ThreadPoolExecutor
+        self.path = path
+        self.client = client or HttpClient(pool_size=max(10, workers))
+        self.dedup = dedup
+        self.stores = {path: ImageStore(path, dedup)}
+        self.timeout = (connect_timeout, read_timeout)
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix='download')
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+
+    def submit(self, url, path=None):
+        """Queue url for download into path, the pool's own directory by default"""
+        path = path or self.path
+        with self.lock:
+            self.submitted += 1
+            if path not in self.stores:
+                os.makedirs(path, exist_ok=True)
+                self.stores[path] = ImageStore(path, self.dedup)
+            store = self.stores[path]
+        self.executor.submit(self._download, url, path, store)
+
+    def _download(self, url, path, store):
+        size = download_file(url, path, self.timeout, self.chunk_size, self.client, store)
+        with self.lock:
+            if size is None:
+                self.failed += 1
+            elif size == SKIPPED:
+                self.skipped += 1
+            else:
+                self.completed += 1
+                self.bytes += size
+
+    def close(self):
+        """Wait for queued downloads to finish"""
+        self.executor.shutdown(wait=True)
+
+    def report(self):
+        """Print download progress and throughput"""
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        megabytes = self.bytes / (1024 * 1024)
+        print(f"{Fore.BLUE}🖼️  Images downloaded: {Fore.YELLOW}{self.completed}/{self.submitted}"
+              f"{Fore.BLUE} ({self.skipped} already stored, {self.failed} failed) in {elapsed:.1f}s")
+        print(f"{Fore.BLUE}⚡ Throughput: {Fore.YELLOW}{self.completed / elapsed:.1f} images/s, "
+              f"{megabytes / elapsed:.2f} MB/s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
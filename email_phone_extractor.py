@@ -6,41 +6,147 @@ by abderrafie
 import os
 import sys
 import argparse
-import requests
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
 from colorama import init, Fore, Style
 import time
+from html import unescape
+from urllib.parse import urlparse
+from checkpoint import Checkpoint
+from crawl_engine import CrawlEngine, DEFAULT_MAX_PAGE_SIZE
+from findings import DEFAULT_CAPACITY, OUTPUT_FORMATS, FindingsWriter
+from frontier import read_seeds, site_name
+from html_parsers import BLOCK_TAGS, PARSER_CHOICES, resolve_parser
+from metrics import add_metrics_arguments, finish_metrics, metrics_from_args
+from http_client import add_http_arguments, client_from_args
+from politeness import add_politeness_arguments, politeness_from_args
+from sitemaps import add_sitemap_arguments, sitemaps_from_args
 
 # Initialize colorama
 init(autoreset=True)
 
+# Emails and every supported phone format in one alternation, so a page is
+# scanned once. Each branch starts with a single known character ('@', '+',
+# '(' or a digit), which lets the regex engine skip ahead quickly; emails
+# are anchored on '@' and the local part is recovered from the text just
+# before it. A phone number must not follow a word character and must not
+# run into further digits, so the bare XXXXXXXXXX and XXX-XXX-XXXX forms
+# no longer match inside longer numbers or email addresses. National
+# numbers may carry the NANP trunk prefix: 1-800-555-0199, 1 (800) ...
+CONTACT_PATTERN = re.compile(r"""
+    @(?P<domain>[A-Za-z0-9.-]+\.[A-Za-z]{2,})\b
+  | \+ (?<![\w.%+-].) \d{1,3}(?:[-.\s]?\(?\d{1,4}\)?){2,5} (?![\d@])  # International
+  | \( (?<![\w.%+-].) \d{3}\)[-.\s]?\d{3}[-.\s]?\d{4} (?![\d@])      # (XXX) XXX-XXXX
+  | \d (?<![\w.%+-].) (?:(?<=1)[-.\s]?(?:\(\d{3}\)|\d{3})|\d{2})         # 1-XXX..., 1 (XXX) ..., or XXX
+        [-.\s]?\d{3}[-.\s]?\d{4} (?![\d@])                              # -XXX-XXXX, .XXX.XXXX, XXXXXXX
+""", re.VERBOSE)
+LOCAL_PART_PATTERN = re.compile(r'[A-Za-z0-9._%+-]{1,64}\Z')
+NON_DIGIT_PATTERN = re.compile(r'\D')
+
+# Markup skipped by the no-DOM scanner: script/style blocks, comments and tags
+MARKUP_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->|</?(?P<tag>[A-Za-z][A-Za-z0-9]*)?[^>]*>',
+                            re.I | re.S)
+SCAN_BATCH_SIZE = 64 * 1024
+
+# Country calling codes for regions whose national format the patterns above cover
+REGION_CALLING_CODES = {'US': '1', 'CA': '1'}
+
+
+def region_from_url(url):
+    """Infer a phone region from the country-code TLD of url, if it is a known one"""
+    host = urlparse(url).hostname or ''
+    region = host.rsplit('.', 1)[-1].upper()
+    return region if region in REGION_CALLING_CODES else None
+
+
+def normalize_phone(number, region=None):
+    """Canonical form of a phone number: E.164 when the country is known, digits otherwise.
+
+    Returns None for international numbers that cannot be valid E.164.
+    """
+    digits = NON_DIGIT_PATTERN.sub('', number)
+    if number.startswith('+'):
+        return '+' + digits if 8 <= len(digits) <= 15 else None
+
+    if len(digits) == 11 and digits[0] == '1':
+        return '+' + digits  # national number with the NANP trunk prefix
+    calling_code = REGION_CALLING_CODES.get(region)
+    if calling_code == '1' and len(digits) == 10:
+        return '+1' + digits
+    return digits
+
+
+def iter_html_text(html):
+    """Yield the text between tags of raw HTML without building a tree, and a newline at block-level tags"""
+    position = 0
+    for match in MARKUP_PATTERN.finditer(html):
+        if match.start() > position:
+            yield _unescape(html[position:match.start()])
+        tag = match.group('tag')
+        if tag and tag.lower() in BLOCK_TAGS:
+            yield '\n'
+        position = match.end()
+    if position < len(html):
+        yield _unescape(html[position:])
+
+
+def _unescape(text):
+    return unescape(text) if '&' in text else text
+
+
 class EmailPhoneExtractor:
-    def __init__(self):
-        # Email regex pattern
-        self.email_pattern = re.compile(
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        )
-        
-        # Phone number regex patterns (various formats)
-        self.phone_patterns = [
-            re.compile(r'\+\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}'),  # International
-            re.compile(r'\(\d{3}\)[-.\s]?\d{3}[-.\s]?\d{4}'),  # (XXX) XXX-XXXX
-            re.compile(r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'),      # XXX-XXX-XXXX
-            re.compile(r'\d{3}\.\d{3}\.\d{4}'),                # XXX.XXX.XXXX
-            re.compile(r'\d{10}'),                             # XXXXXXXXXX
-        ]
-
-    def extract_emails_and_phones(self, text):
-        emails = set(self.email_pattern.findall(text))
-        phones = set()
-        
-        for pattern in self.phone_patterns:
-            phones.update(pattern.findall(text))
-        
+    """Contact extractor, usable on its own or plugged into a CrawlEngine"""
+    name = 'contacts'
+
+    def __init__(self, region=None, dom=True):
+        self.pattern = CONTACT_PATTERN
+        self.region = region
+        self.dom = dom
+
+    def extract_emails_and_phones(self, text, region=None):
+        """Scan text once, returning deduplicated emails and normalized phone numbers"""
+        return self.scan_segments((text,), region)
+
+    def scan_segments(self, segments, region=None, batch_size=SCAN_BATCH_SIZE):
+        """Scan a stream of text segments, returning deduplicated emails and normalized phones.
+
+        Segments are joined as they render, with no separator, into batches
+        of about batch_size characters, so each one is copied once and
+        scanned once. A batch only ends after a segment ending in
+        whitespace, so contacts split across inline tags stay whole.
+        """
+        region = region or self.region
+        emails = set()
+        raw_phones = set()
+
+        batch = []
+        batch_length = 0
+        for segment in segments:
+            batch.append(segment)
+            batch_length += len(segment)
+            if batch_length >= batch_size and segment[-1:].isspace():
+                self._scan(''.join(batch), emails, raw_phones)
+                batch = []
+                batch_length = 0
+        if batch:
+            self._scan(''.join(batch), emails, raw_phones)
+
+        # Normalize each distinct spelling once
+        phones = {normalize_phone(phone, region) for phone in raw_phones}
+        phones.discard(None)
         return emails, phones
 
+    def _scan(self, text, emails, raw_phones):
+        for match in self.pattern.finditer(text):
+            if match.lastgroup is None:
+                raw_phones.add(match.group())
+                continue
+            start = match.start()
+            local = LOCAL_PART_PATTERN.search(text, max(0, start - 64), start)
+            if local:
+                local = local.group().lstrip('._%+-')
+                if local:
+                    emails.add(f"{local}@{match.group('domain').lower()}")
+
     def save_to_file(self, data, filename, data_type):
         """Save extracted data to file"""
         try:
@@ -56,118 +162,213 @@ class EmailPhoneExtractor:
         except Exception as e:
             print(f"{Fore.RED}✗ Error saving {data_type}: {e}")
 
-    def get_links(self, url, base_domain):
-        """Extract all links from a webpage that belong to the same domain"""
-        try:
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links = set()
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                absolute_url = urljoin(url, href)
-                parsed_url = urlparse(absolute_url)
-                if parsed_url.netloc == base_domain.netloc:
-                    links.add(absolute_url)
-                    
-            return links
-        except Exception as e:
-            print(f"{Fore.RED}✗ Failed to get links: {e}")
-            return set()
-
-    def extract_from_url(self, url, recursive=False, max_depth=5, save_path='./data/', current_depth=1):
-        """Extract emails and phone numbers from URL"""
-        if current_depth > max_depth:
-            return set(), set()
-            
-        # Nice scraping indicator
-        if current_depth == 1:
-            print(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping... {Fore.YELLOW}{url}")
+    def extract(self, page):
+        """Extract emails and phone numbers from a crawled page.
+
+        The parsed document's text is walked once and streamed to the
+        scanner; in no-DOM mode the decoded HTML is scanned directly with
+        tags stripped and no document is built.
+        """
+        if self.dom:
+            segments = page.document.strings()
         else:
-            print(f"{Fore.CYAN}   └─ {Style.DIM}Depth {current_depth}: {url}")
-        
-        all_emails = set()
-        all_phones = set()
-        
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract text from the page
-            text_content = soup.get_text()
-            
-            # Also check specific elements that might contain contact info
-            contact_elements = soup.find_all(['div', 'span', 'p', 'li'], 
-                                           class_=re.compile('contact|email|phone|footer', re.I))
-            for element in contact_elements:
-                text_content += " " + element.get_text()
-            
-            # Extract emails and phones
-            emails, phones = self.extract_emails_and_phones(text_content)
-            all_emails.update(emails)
-            all_phones.update(phones)
-            
+            segments = iter_html_text(page.text)
+        return self.scan_segments(segments, self.region or region_from_url(page.url))
+
+    def extract_from_url(self, url, recursive=False, max_depth=5, save_path='./data/', sort_query=False,
+                         concurrency=1, per_host=2, client=None, checkpoint=None, parser='auto',
+                         max_page_size=DEFAULT_MAX_PAGE_SIZE, workers=0, politeness=None,
+                         findings=None, sitemaps=None, frontier_dir=None):
+        """Extract emails and phone numbers from URL.
+
+        With a FindingsWriter, contacts are written to it as they are found
+        instead of being collected, and empty sets are returned.
+        """
+        results = self._extract([url], None, recursive, max_depth, sort_query=sort_query,
+                                concurrency=concurrency, per_host=per_host,
+                                client=client, checkpoint=checkpoint, parser=parser,
+                                max_page_size=max_page_size, workers=workers, politeness=politeness,
+                                findings=findings, sitemaps=sitemaps, frontier_dir=frontier_dir)
+        return results[None]
+
+    def extract_from_seeds(self, seeds, recursive=False, max_depth=5, sort_query=False,
+                           concurrency=1, per_host=2, client=None, checkpoint=None, parser='auto',
+                           max_page_size=DEFAULT_MAX_PAGE_SIZE, workers=0, politeness=None,
+                           findings=None, sitemaps=None, frontier_dir=None):
+        """Extract emails and phone numbers from several sites in one crawl.
+
+        Returns {site name: (emails, phones)} for every seed; with a
+        FindingsWriter the sets stay empty and each record names its site.
+        """
+        results = self._extract(seeds, site_name, recursive, max_depth, sort_query=sort_query,
+                                concurrency=concurrency, per_host=per_host,
+                                client=client, checkpoint=checkpoint, parser=parser,
+                                max_page_size=max_page_size, workers=workers, politeness=politeness,
+                                findings=findings, sitemaps=sitemaps, frontier_dir=frontier_dir)
+        return results
+
+    def _extract(self, seeds, partition, recursive, max_depth, *, sort_query, concurrency, per_host,
+                 client, checkpoint, parser, max_page_size, workers, politeness, findings, sitemaps,
+                 frontier_dir):
+        """Crawl seeds and collect contacts per partition(page URL), or under None"""
+        def result_kind(kind, key):
+            return kind if key is None else f'{kind}:{key}'
+
+        results = {}
+
+        def results_for(key):
+            if key not in results:
+                results[key] = (set(), set())
+                if checkpoint is not None and findings is None:
+                    results[key][0].update(checkpoint.results(result_kind('email', key)))
+                    results[key][1].update(checkpoint.results(result_kind('phone', key)))
+            return results[key]
+
+        for seed in seeds:
+            results_for(partition(seed) if partition else None)
+
+        engine = CrawlEngine([self], sort_query=sort_query, concurrency=concurrency, per_host=per_host,
+                             client=client, checkpoint=checkpoint, parser=parser,
+                             max_page_size=max_page_size, workers=workers,
+                             politeness=politeness, sitemaps=sitemaps, frontier_dir=frontier_dir)
+        for page in engine.crawl(seeds, max_depth if recursive else 1):
+            # Nice scraping indicator
+            if page.depth == 1:
+                print(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping... {Fore.YELLOW}{page.url}")
+            else:
+                print(f"{Fore.CYAN}   └─ {Style.DIM}Depth {page.depth}: {page.url}")
+
+            key = partition(page.url) if partition else None
+            all_emails, all_phones = results_for(key)
+            if page.error:
+                print(f"{Fore.RED}✗ Error: {page.error}")
+                continue
+
+            emails, phones = page.results[self.name]
+            if findings is not None:
+                # The output file is the record; nothing is kept in memory
+                with engine.metrics.time('disk_write'):
+                    for email in emails:
+                        findings.add('email', email, page.url, page.depth, key or '')
+                    for phone in phones:
+                        findings.add('phone', phone, page.url, page.depth, key or '')
+            else:
+                all_emails.update(emails)
+                all_phones.update(phones)
+            if checkpoint is not None and findings is None:
+                checkpoint.add_results(result_kind('email', key), emails)
+                checkpoint.add_results(result_kind('phone', key), phones)
+
             # Show results with icons
             if emails or phones:
                 print(f"   {Fore.GREEN}📧 {len(emails)} emails  📞 {len(phones)} phones")
-            
-            # Recursive processing
-            if recursive and current_depth < max_depth:
-                base_domain = urlparse(url)
-                links = self.get_links(url, base_domain)
-                
-                for link in list(links)[:10]:  # Limit to avoid overwhelming
-                    try:
-                        sub_emails, sub_phones = self.extract_from_url(
-                            link, recursive, max_depth, save_path, current_depth + 1
-                        )
-                        all_emails.update(sub_emails)
-                        all_phones.update(sub_phones)
-                    except Exception as e:
-                        print(f"{Fore.RED}   ✗ Failed: {e}")
-                        continue
-                        
-        except Exception as e:
-            print(f"{Fore.RED}✗ Error: {e}")
-        
-        return all_emails, all_phones
 
-def main():
+        return results
+
+def main(argv=None):
+    """Command line entry point; argv defaults to sys.argv[1:]"""
     parser = argparse.ArgumentParser(description='Email & Phone Extractor by abderrafie - extract contact information from websites')
-    parser.add_argument('url', help='URL to process')
+    parser.add_argument('url', nargs='?', help='URL to process')
+    parser.add_argument('--seeds', metavar='FILE',
+                        help="Extract from every URL listed in FILE ('-' for stdin), saving each site to its own subdirectory")
     parser.add_argument('-r', action='store_true', help='Recursive extraction')
     parser.add_argument('-l', type=int, default=5, help='Maximum depth level for recursive extraction')
     parser.add_argument('-p', default='./data/', help='Path to save extracted files')
     parser.add_argument('--emails-only', action='store_true', help='Extract only emails')
     parser.add_argument('--phones-only', action='store_true', help='Extract only phone numbers')
+    parser.add_argument('--no-dom', action='store_true',
+                        help='Scan the raw HTML with tags stripped instead of the parsed page text (faster)')
+    parser.add_argument('--region', type=str.upper, choices=sorted(REGION_CALLING_CODES),
+                        help='Region for national phone numbers, used to write them in E.164 form (default: inferred from the site TLD)')
+    parser.add_argument('--sort-query', action='store_true', help='Treat URLs differing only in query parameter order as the same page')
+    parser.add_argument('--max-page-size', type=float, default=5,
+                        help='Maximum page size in MB; larger pages are cut off (default: 5)')
+    parser.add_argument('--parser', choices=PARSER_CHOICES, default='auto',
+                        help='HTML parser backend; auto picks the fastest available (default: auto)')
+    parser.add_argument('-j', '--concurrency', type=int, default=1, help='Number of pages fetched concurrently (default: 1)')
+    parser.add_argument('--per-host', type=int, default=2, help='Maximum concurrent connections per host (default: 2)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Parse pages in N worker processes to use several cores (default: 0, parse in threads)')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='txt',
+                        help='txt writes sorted emails.txt/phones.txt at the end; jsonl, csv and sqlite write '
+                             'each finding to results.<format> as soon as it is found (default: txt)')
+    parser.add_argument('--dedup-capacity', type=int, default=DEFAULT_CAPACITY,
+                        help='Expected number of distinct findings, used to size the jsonl/csv '
+                             'duplicate filter (default: 1000000)')
+    parser.add_argument('--disk-frontier', action='store_true',
+                        help='Keep the queue of discovered URLs in a temporary SQLite file in the output '
+                             'directory instead of memory, for very large crawls')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted crawl from its checkpoint')
+    add_http_arguments(parser)
+    add_politeness_arguments(parser)
+    add_sitemap_arguments(parser)
+    add_metrics_arguments(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if (args.url is None) == (args.seeds is None):
+        parser.error('give either a URL or --seeds FILE')
+    try:
+        resolve_parser(args.parser)
+    except ValueError as e:
+        parser.error(str(e))
+    seeds = read_seeds(args.seeds) if args.seeds else None
+    if seeds == []:
+        parser.error(f'no seed URLs in {args.seeds}')
     
     # Create output directory
     os.makedirs(args.p, exist_ok=True)
     
     # Initialize extractor
-    extractor = EmailPhoneExtractor()
+    extractor = EmailPhoneExtractor(args.region, dom=not args.no_dom)
     
-    # Extract data
-    print(f"{Fore.CYAN}🚀 {Style.BRIGHT}Starting extraction from: {Fore.YELLOW}{args.url}")
-    emails, phones = extractor.extract_from_url(args.url, args.r, args.l, args.p)
+    # Extract data, checkpointing progress in the output directory
+    checkpoint = Checkpoint(args.p, 'extractor', resume=args.resume)
+    findings = None
+    if args.output_format != 'txt':
+        types = {'email'} if args.emails_only else {'phone'} if args.phones_only else None
+        findings = FindingsWriter(args.p, args.output_format, args.resume, args.dedup_capacity, types)
+    metrics = metrics_from_args(args)
+    client = client_from_args(args, metrics)
+    politeness = politeness_from_args(args, client)
+    crawl_options = dict(sort_query=args.sort_query, concurrency=args.concurrency, per_host=args.per_host,
+                         client=client, checkpoint=checkpoint, parser=args.parser,
+                         max_page_size=int(args.max_page_size * 1024 * 1024), workers=args.workers,
+                         politeness=politeness, findings=findings,
+                         sitemaps=sitemaps_from_args(args, client, politeness),
+                         frontier_dir=args.p if args.disk_frontier else None)
+    if seeds:
+        print(f"{Fore.CYAN}🚀 {Style.BRIGHT}Starting extraction from {Fore.YELLOW}{len(seeds)} seeds")
+        results = extractor.extract_from_seeds(seeds, args.r, args.l, **crawl_options)
+        outputs = [(os.path.join(args.p, site), emails, phones) for site, (emails, phones) in sorted(results.items())]
+    else:
+        print(f"{Fore.CYAN}🚀 {Style.BRIGHT}Starting extraction from: {Fore.YELLOW}{args.url}")
+        emails, phones = extractor.extract_from_url(args.url, args.r, args.l, args.p, **crawl_options)
+        outputs = [(args.p, emails, phones)]
+    checkpoint.close()
+    finish_metrics(metrics, args)
     
-    # Save results based on arguments
-    if not args.phones_only:
-        email_file = os.path.join(args.p, 'emails.txt')
-        extractor.save_to_file(emails, email_file, 'emails')
+    if findings is not None:
+        findings.close()
+        print(f"\n{Fore.GREEN}🎉 {Style.BRIGHT}Extraction completed!")
+        print(f"{Fore.BLUE}📧 Total emails found: {Fore.YELLOW}{findings.counts['email']}")
+        print(f"{Fore.BLUE}📞 Total phone numbers found: {Fore.YELLOW}{findings.counts['phone']}")
+        print(f"{Fore.BLUE}📁 Results saved to: {Fore.YELLOW}{findings.path}")
+        return
     
-    if not args.emails_only:
-        phone_file = os.path.join(args.p, 'phones.txt')
-        extractor.save_to_file(phones, phone_file, 'phone numbers')
+    # Save results based on arguments
+    for output_path, emails, phones in outputs:
+        os.makedirs(output_path, exist_ok=True)
+        if not args.phones_only:
+            email_file = os.path.join(output_path, 'emails.txt')
+            extractor.save_to_file(emails, email_file, 'emails')
+        
+        if not args.emails_only:
+            phone_file = os.path.join(output_path, 'phones.txt')
+            extractor.save_to_file(phones, phone_file, 'phone numbers')
     
     print(f"\n{Fore.GREEN}🎉 {Style.BRIGHT}Extraction completed!")
-    print(f"{Fore.BLUE}📧 Total emails found: {Fore.YELLOW}{len(emails)}")
-    print(f"{Fore.BLUE}📞 Total phone numbers found: {Fore.YELLOW}{len(phones)}")
+    print(f"{Fore.BLUE}📧 Total emails found: {Fore.YELLOW}{sum(len(emails) for _, emails, _ in outputs)}")
+    print(f"{Fore.BLUE}📞 Total phone numbers found: {Fore.YELLOW}{sum(len(phones) for _, _, phones in outputs)}")
     print(f"{Fore.BLUE}📁 Files saved to: {Fore.YELLOW}{args.p}")
 
 if __name__ == '__main__':
@@ -0,0 +1,145 @@
+"""
+Findings - Streaming structured output for extracted results
+by abderrafie
+"""
+import csv
+import hashlib
+import json
+import math
+import os
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+
+OUTPUT_FORMATS = ['txt', 'jsonl', 'csv', 'sqlite']
+FIELDS = ['type', 'value', 'site', 'url', 'depth', 'timestamp']
+DEFAULT_CAPACITY = 1000000
+
+
+class BloomFilter:
+    """Fixed-size set membership test with a bounded false positive rate.
+
+    Memory depends only on capacity and error_rate (about 1.8 MB for a
+    million keys at 0.1%), never on how many keys are added. A key that
+    was never added is reported as present with probability error_rate.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add key; returns False if it was (probably) present already"""
+        added = False
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, key):
+        return all(self.bits[position // 8] & (1 << position % 8) for position in self._positions(key))
+
+
+class FindingsWriter:
+    """Writes every new finding to results.<format> in directory as soon as it is found.
+
+    Each record holds the finding type and value, the site it belongs to
+    (multi-seed crawls only), the page it was found on, that page's depth
+    and a UTC timestamp. Duplicates are dropped with a Bloom filter for
+    jsonl/csv and a unique index for sqlite, so memory stays flat however
+    long the crawl runs. With resume=True an existing file is appended
+    to, and its records are loaded into the Bloom filter first. When
+    types is given, findings of other types are ignored.
+    """
+    def __init__(self, directory, fmt, resume=False, capacity=DEFAULT_CAPACITY, types=None):
+        if fmt not in OUTPUT_FORMATS[1:]:
+            raise ValueError(f'unknown output format: {fmt}')
+        self.format = fmt
+        self.types = types
+        self.path = os.path.join(directory, f'results.{fmt}')
+        self.counts = Counter()
+        if not resume and os.path.exists(self.path):
+            os.remove(self.path)
+
+        if fmt == 'sqlite':
+            self.db = sqlite3.connect(self.path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS findings (type TEXT, value TEXT, site TEXT, '
+                            'url TEXT, depth INTEGER, timestamp TEXT, UNIQUE (type, site, value))')
+            self.counts.update(dict(self.db.execute('SELECT type, COUNT(*) FROM findings GROUP BY type')))
+            self.pending = 0
+            return
+
+        self.seen = BloomFilter(capacity)
+        for record in self._existing_records():
+            self.seen.add(self._key(record['type'], record['value'], record['site']))
+            self.counts[record['type']] += 1
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, 'a', encoding='utf-8', newline='' if fmt == 'csv' else None, buffering=1)
+        if not new_file and not self._ends_with_newline():
+            self.file.write('\n')  # finish the line torn by an interrupted run
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(self.file, FIELDS)
+            if new_file:
+                self.csv.writeheader()
+
+    def _existing_records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8', newline='') as f:
+            if self.format == 'csv':
+                yield from csv.DictReader(f)
+                return
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+    @staticmethod
+    def _key(kind, value, site):
+        return f'{kind}\0{site}\0{value}'
+
+    def add(self, kind, value, url, depth, site=''):
+        """Record a finding; returns False if it was already recorded or its type is not wanted"""
+        if self.types is not None and kind not in self.types:
+            return False
+        record = {'type': kind, 'value': value, 'site': site, 'url': url, 'depth': depth,
+                  'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        if self.format == 'sqlite':
+            cursor = self.db.execute('INSERT OR IGNORE INTO findings VALUES (?, ?, ?, ?, ?, ?)',
+                                     [record[field] for field in FIELDS])
+            if not cursor.rowcount:
+                return False
+            self.pending += 1
+            if self.pending >= 500:
+                self.db.commit()
+                self.pending = 0
+        else:
+            if not self.seen.add(self._key(kind, value, site)):
+                return False
+            if self.format == 'csv':
+                self.csv.writerow(record)
+            else:
+                self.file.write(json.dumps(record) + '\n')
+        self.counts[kind] += 1
+        return True
+
+    def close(self):
+        if self.format == 'sqlite':
+            self.db.commit()
+            self.db.close()
+        else:
+            self.file.close()
@@ -0,0 +1,255 @@
+"""
+Frontier - URL canonicalization and breadth-first crawl queue
+by abderrafie
+"""
+import heapq
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url, sort_query=False):
+    """Normalize a URL so equivalent spellings map to the same string.
+
+    Drops the fragment, lowercases scheme and host, removes default ports
+    and, when sort_query is set, orders query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 literal
+
+    netloc = host
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or '/'
+    query = parts.query
+    if sort_query and query:
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def site_name(url):
+    """Filesystem-safe name of the site a URL belongs to, used to partition multi-seed output"""
+    netloc = urlsplit(canonicalize_url(url)).netloc.rpartition('@')[2]
+    return re.sub(r'[^\w.-]', '_', netloc)
+
+
+def read_seeds(source):
+    """Read seed URLs from a file, one per line, or from stdin when source is '-'.
+
+    Blank lines and # comments are ignored, URLs without a scheme get
+    https://, and duplicates are dropped.
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    seeds = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if not line.startswith(('http://', 'https://')):
+            line = 'https://' + line
+        seeds.append(line)
+    return list(dict.fromkeys(seeds))
+
+
+class MemoryQueue:
+    """Frontier storage in Python objects: the fastest, but it grows with every URL found"""
+    def __init__(self):
+        self.seen = set()
+        self.heaps = {}  # host -> heap of (depth, priority, sequence, url)
+        self.sequence = 0
+
+    def admit(self, url):
+        """Mark url as seen; returns False if it was seen already"""
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        return True
+
+    def push(self, host, url, depth, priority=0):
+        self.sequence += 1
+        heapq.heappush(self.heaps.setdefault(host, []), (depth, priority, self.sequence, url))
+
+    def pop(self, host):
+        """(url, depth) of host's shallowest queued URL, lowest priority value first, then oldest"""
+        heap = self.heaps[host]
+        depth, _, _, url = heapq.heappop(heap)
+        if not heap:
+            del self.heaps[host]
+        return url, depth
+
+    def close(self):
+        pass
+
+
+class DiskQueue:
+    """Frontier storage in a temporary SQLite file, for crawls too large to track in memory.
+
+    Seen and queued URLs share one indexed table, so memory is bounded by
+    SQLite's page cache (cache_kb) however many URLs are discovered. The
+    file is created in directory, or the system temp directory, and
+    deleted on close.
+    """
+    def __init__(self, directory=None, cache_kb=8 * 1024, commit_every=10000):
+        fd, self.path = tempfile.mkstemp(prefix='.frontier-', suffix='.sqlite', dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode = OFF')  # scratch data, never needed after a crash
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute(f'PRAGMA cache_size = -{cache_kb}')
+        self.db.execute('CREATE TABLE urls (url TEXT PRIMARY KEY, host TEXT, depth INTEGER, '
+                        'priority REAL, queued INTEGER DEFAULT 0)')
+        self.db.execute('CREATE INDEX queue ON urls (host, queued, depth, priority)')
+        self.commit_every = commit_every
+        self.writes = 0
+
+    def admit(self, url):
+        """Mark url as seen; returns False if it was seen already"""
+        cursor = self.db.execute('INSERT OR IGNORE INTO urls (url) VALUES (?)', (url,))
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def push(self, host, url, depth, priority=0):
+        self.db.execute('INSERT INTO urls VALUES (?, ?, ?, ?, 1) ON CONFLICT (url) DO UPDATE SET '
+                        'host = excluded.host, depth = excluded.depth, priority = excluded.priority, queued = 1',
+                        (url, host, depth, priority))
+        self._wrote()
+
+    def pop(self, host):
+        """(url, depth) of host's shallowest queued URL, lowest priority value first, then oldest"""
+        rowid, url, depth = self.db.execute(
+            'SELECT rowid, url, depth FROM urls WHERE host = ? AND queued = 1 '
+            'ORDER BY depth, priority, rowid LIMIT 1', (host,)).fetchone()
+        self.db.execute('UPDATE urls SET queued = 0 WHERE rowid = ?', (rowid,))
+        self._wrote()
+        return url, depth
+
+    def _wrote(self):
+        self.writes += 1
+        if self.writes >= self.commit_every:
+            self.db.commit()  # lets SQLite write dirty pages out instead of holding them
+            self.writes = 0
+
+    def close(self):
+        self.db.close()
+        os.remove(self.path)
+
+
+class Frontier:
+    """Breadth-first queue of URLs to crawl; each canonical URL is admitted once.
+
+    URLs are queued per host and handed out round-robin across hosts, so
+    a crawl of many seeds makes progress on all of them instead of
+    draining one site before starting the next. Within a host, shallower
+    URLs come first, then those with the lowest priority value, then the
+    oldest.
+
+    URLs are kept in queue, a MemoryQueue by default; a DiskQueue keeps
+    memory flat on crawls that discover millions of URLs.
+
+    With a Politeness, hosts that are cooling down are passed over until
+    their next request is due, and pop() returns None when no host is.
+
+    With a checkpoint, admissions are persisted and the frontier starts
+    from the URLs a previous run admitted but never completed.
+    """
+    def __init__(self, max_depth, sort_query=False, checkpoint=None, politeness=None, queue=None):
+        self.max_depth = max_depth
+        self.sort_query = sort_query
+        self.checkpoint = checkpoint
+        self.politeness = politeness
+        self.queue = queue if queue is not None else MemoryQueue()
+        self.queued = {}  # host -> number of queued URLs
+        self.hosts = deque()  # hosts with queued URLs, in round-robin order
+        self.size = 0
+        if checkpoint is not None:
+            for url in checkpoint.seen_urls():
+                self.queue.admit(url)
+            for url, depth in checkpoint.pending():
+                self._push(url, depth)
+
+    def add(self, url, depth, priority=0):
+        """Queue url at depth; returns False if it is too deep or already seen"""
+        if depth > self.max_depth:
+            return False
+        url = canonicalize_url(url, self.sort_query)
+        if not self.queue.admit(url):
+            return False
+        self._push(url, depth, priority)
+        if self.checkpoint is not None:
+            self.checkpoint.admit(url, depth)
+        return True
+
+    def _push(self, url, depth, priority=0):
+        host = urlsplit(url).netloc
+        if host not in self.queued:
+            self.queued[host] = 0
+            self.hosts.append(host)
+        self.queued[host] += 1
+        self.queue.push(host, url, depth, priority)
+        self.size += 1
+
+    def pop(self, reserve=True):
+        """Next URL from the first host, in turn order, that may be requested now.
+
+        With reserve, the host's politeness token is taken for the request;
+        callers that request the URL later take it themselves.
+        """
+        for _ in range(len(self.hosts)):
+            if self.politeness is None or self.politeness.delay(self.hosts[0]) <= 0:
+                break
+            self.hosts.rotate(-1)
+        else:
+            return None
+        host = self.hosts.popleft()
+        if self.politeness is not None and reserve:
+            self.politeness.reserve(host)
+        item = self.queue.pop(host)
+        self.queued[host] -= 1
+        if self.queued[host]:
+            self.hosts.append(host)
+        else:
+            del self.queued[host]
+        self.size -= 1
+        return item
+
+    def wait(self):
+        """Seconds until the next queued host may be requested"""
+        if self.politeness is None or not self.hosts:
+            return 0
+        return min(self.politeness.delay(host) for host in self.hosts)
+
+    def close(self):
+        self.queue.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,227 @@
+"""
+HTML Parsers - Pluggable parser backends
+by abderrafie
+
+A page's document exposes its <a href> values, its images, the CSS of
+its <style> elements and style attributes, and its visible text,
+whichever backend produced it. The text comes as string segments meant
+to be joined with no separator, the way they render: a newline segment
+marks each block-level tag boundary, and inline markup such as
+<span> or <b> splits nothing. Each image is a (sources, srcsets) pair
+of attribute values from one <img>, or from one <picture> with all its
+<source> elements; lazy-loading attributes such as data-src come first.
+
+- html.parser / lxml: a BeautifulSoup tree built with that tree builder
+- stream: a single tokenizer pass that never builds a tree (lxml's
+  target parser when lxml is installed, the stdlib HTMLParser otherwise)
+"""
+from html.parser import HTMLParser
+
+PARSER_CHOICES = ['auto', 'html.parser', 'lxml', 'stream']
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'caption', 'dd', 'details', 'dialog', 'div',
+    'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'head', 'header', 'hr', 'html', 'li', 'main', 'nav', 'ol', 'option', 'p', 'pre', 'section', 'summary',
+    'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul',
+})
+IMAGE_SOURCE_ATTRIBUTES = ('data-src', 'data-lazy-src', 'data-original', 'data-lazy', 'src')
+IMAGE_SRCSET_ATTRIBUTES = ('data-srcset', 'data-lazy-srcset', 'srcset')
+
+etree = False  # lxml.etree once imported, None when lxml is not installed
+
+
+def lxml_etree():
+    """lxml.etree, or None without lxml; imported on first use to keep startup fast"""
+    global etree
+    if etree is False:
+        try:
+            from lxml import etree as module
+        except ImportError:
+            module = None
+        etree = module
+    return etree
+
+
+def resolve_parser(name):
+    """Map a --parser choice to a concrete backend; 'auto' picks the fastest one"""
+    if name == 'auto':
+        return 'stream'
+    if name == 'lxml' and lxml_etree() is None:
+        raise ValueError('the lxml parser backend requires lxml (pip install lxml)')
+    if name not in PARSER_CHOICES:
+        raise ValueError(f'unknown parser backend: {name}')
+    return name
+
+
+def make_soup(html, parser):
+    """BeautifulSoup tree for html, built with the html.parser or lxml tree builder"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, parser)
+
+
+def parse_document(html, parser):
+    if parser == 'stream':
+        return StreamDocument(html)
+    return SoupDocument(make_soup(html, parser))
+
+
+def image_attributes(attrib, sources, srcsets):
+    """Append an element's image URL and srcset attribute values, lazy-loading ones first"""
+    sources.extend(attrib[name] for name in IMAGE_SOURCE_ATTRIBUTES if attrib.get(name))
+    srcsets.extend(attrib[name] for name in IMAGE_SRCSET_ATTRIBUTES if attrib.get(name))
+
+
+class SoupDocument:
+    """Document backed by a BeautifulSoup tree"""
+    def __init__(self, soup):
+        self.soup = soup
+        self.links = [a['href'] for a in soup.find_all('a', href=True)]
+        self.images = []
+        for element in soup.find_all(['img', 'picture']):
+            if element.name == 'img' and element.find_parent('picture') is not None:
+                continue  # part of its <picture>
+            sources, srcsets = [], []
+            for tag in element.find_all(['source', 'img']) if element.name == 'picture' else [element]:
+                image_attributes(tag.attrs, sources if tag.name == 'img' else [], srcsets)
+            if sources or srcsets:
+                self.images.append((sources, srcsets))
+        self.styles = [tag['style'] for tag in soup.find_all(style=True)]
+        self.styles += [style.get_text() for style in soup.find_all('style')]
+
+    def strings(self):
+        from bs4.element import PreformattedString, Tag
+        pending = [iter(self.soup.contents)]
+        while pending:
+            node = next(pending[-1], None)
+            if node is None:
+                pending.pop()
+            elif isinstance(node, Tag):
+                if node.name in SKIPPED_TEXT_TAGS:
+                    continue
+                if node.name in BLOCK_TAGS:
+                    yield '\n'
+                    pending.append(iter(node.contents + ['\n']))
+                else:
+                    pending.append(iter(node.contents))
+            elif not isinstance(node, PreformattedString):  # comments, doctypes, CDATA
+                yield str(node)
+
+
+class StreamDocument:
+    """Document collected in one tokenizer pass, without building a tree"""
+    def __init__(self, html):
+        self.links = []
+        self.images = []
+        self.styles = []
+        self.texts = []
+        self._skip_depth = 0
+        self._run = []  # text chunks since the last block-level tag, merged when one starts or ends
+        self._picture = None  # (sources, srcsets) of the open <picture>
+        self._style = None  # text chunks of the open <style>
+
+        etree = lxml_etree()
+        if etree is not None:
+            parser = etree.HTMLParser(target=self)
+            try:
+                parser.feed(html)
+                parser.close()
+                return
+            except (etree.ParserError, ValueError):
+                self._parse_stdlib(html)
+                return
+        self._parse_stdlib(html)
+
+    def _parse_stdlib(self, html):
+        self.links, self.images, self.styles, self.texts = [], [], [], []
+        self._skip_depth = 0
+        self._run = []
+        self._picture = self._style = None
+        tokenizer = _Tokenizer(self)
+        tokenizer.feed(html)
+        tokenizer.close()
+        self.close()
+
+    # Target parser interface (shared with _Tokenizer)
+    def start(self, tag, attrib):
+        if tag in BLOCK_TAGS:
+            self._flush_text()
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.links.append(href)
+        elif tag == 'img':
+            if self._picture is not None:
+                image_attributes(attrib, *self._picture)
+            else:
+                image = ([], [])
+                image_attributes(attrib, *image)
+                if image[0] or image[1]:
+                    self.images.append(image)
+        elif tag == 'source':
+            if self._picture is not None:
+                image_attributes(attrib, [], self._picture[1])
+        elif tag == 'picture':
+            self._picture = ([], [])
+        elif tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+            if tag == 'style':
+                self._style = []
+        if attrib.get('style'):
+            self.styles.append(attrib['style'])
+
+    def end(self, tag):
+        if tag in BLOCK_TAGS:
+            self._flush_text()
+        if tag == 'picture' and self._picture is not None:
+            if self._picture[0] or self._picture[1]:
+                self.images.append(self._picture)
+            self._picture = None
+        elif tag in SKIPPED_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+            if tag == 'style' and self._style is not None:
+                self.styles.append(''.join(self._style))
+                self._style = None
+
+    def data(self, data):
+        if self._style is not None:
+            self._style.append(data)
+        elif not self._skip_depth:
+            self._run.append(data)
+
+    def close(self):
+        self._flush_text()
+        if self._picture is not None and (self._picture[0] or self._picture[1]):
+            self.images.append(self._picture)  # unclosed <picture>
+            self._picture = None
+        return self
+
+    def _flush_text(self):
+        if self._run:
+            self.texts.append(''.join(self._run))
+            self._run = []
+
+    def strings(self):
+        for text in self.texts:
+            yield text
+            yield '\n'
+
+
+class _Tokenizer(HTMLParser):
+    """Stdlib tokenizer feeding a StreamDocument when lxml is unavailable"""
+    def __init__(self, document):
+        super().__init__(convert_charrefs=True)
+        self.document = document
+
+    def handle_starttag(self, tag, attrs):
+        self.document.start(tag, {name: value for name, value in attrs if value is not None})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.document.end(tag)
+
+    def handle_endtag(self, tag):
+        self.document.end(tag)
+
+    def handle_data(self, data):
+        self.document.data(data)
@@ -0,0 +1,155 @@
+"""
+HTTP Cache - On-disk response cache with conditional revalidation
+by abderrafie
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified')
+
+
+class HttpCache:
+    """Response bodies stored with their ETag / Last-Modified validators.
+
+    Only responses carrying a validator are stored, since they are the
+    only ones a later run can revalidate with a conditional request. When
+    the cache grows past max_bytes the least recently used entries are
+    evicted.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, key + '.json'), os.path.join(folder, key + '.body')
+
+    def _load_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or not os.path.exists(body_path):
+            return None
+        return meta
+
+    def conditional_headers(self, url):
+        """Headers that turn a GET for url into a conditional request"""
+        meta = self._load_meta(url)
+        if meta is None:
+            return {}
+        headers = {}
+        if meta['headers'].get('etag'):
+            headers['If-None-Match'] = meta['headers']['etag']
+        if meta['headers'].get('last-modified'):
+            headers['If-Modified-Since'] = meta['headers']['last-modified']
+        return headers
+
+    def response(self, url):
+        """Rebuild a requests.Response for url from the cache, or None"""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+        meta = self._load_meta(url)
+        if meta is None:
+            return None
+        _, body_path = self._paths(url)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+        os.utime(body_path)  # mark as recently used
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def store(self, url, headers, body):
+        """Cache body for url if the response carries a validator"""
+        writer = self.writer(url, headers)
+        if writer is not None:
+            writer.write(body)
+            writer.commit()
+
+    def cacheable(self, headers):
+        return bool(headers.get('etag') or headers.get('last-modified'))
+
+    def writer(self, url, headers):
+        """Return a CacheWriter to stream a body into the cache, or None if not cacheable"""
+        if not self.cacheable(headers):
+            return None
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers.get(name)}
+        return CacheWriter(self, url, kept)
+
+    def _commit(self, url, headers, tmp_path, size):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with self.lock:
+            if os.path.exists(body_path):
+                self.size -= os.path.getsize(body_path)
+            os.replace(tmp_path, body_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'headers': headers, 'size': size}, f)
+            self.size += size
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """Yield (body_path, size, last_used) for every cached body"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.body'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes"""
+        target = self.max_bytes * 0.9
+        for body_path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self.size <= target:
+                break
+            for path in (body_path, body_path[:-len('.body')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.size -= size
+
+
+class CacheWriter:
+    """Streams a response body into a temporary file, then commits it to the cache"""
+    def __init__(self, cache, url, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, suffix='.part')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        self.file.close()
+        self.cache._commit(self.url, self.headers, self.tmp_path, self.size)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
@@ -0,0 +1,282 @@
+"""
+HTTP Client - Shared pooled keep-alive HTTP layer
+by abderrafie
+"""
+import codecs
+import os
+import re
+import time
+from http_cache import HttpCache, DEFAULT_CACHE_SIZE
+
+DEFAULT_USER_AGENT = 'Arachnida/1.0 (+https://github.com/aabderrafie/Arachnida)'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class HttpClient:
+    """One session shared by every fetch so connections are pooled and kept alive.
+
+    pool_size is the number of keep-alive connections kept per host.
+    Requests answered with 429/5xx are retried with exponential backoff.
+    With http2=True and httpx[http2] installed, requests go over HTTP/2.
+    With an HttpCache, requests are made conditional and 304 answers are
+    served from the cached body. With a Metrics, new connections and
+    time to first byte are timed and cache hits are counted.
+    """
+    def __init__(self, pool_size=10, retries=3, backoff=0.5, user_agent=DEFAULT_USER_AGENT,
+                 http2=False, timeout=10, cache=None, metrics=None):
+        self.cache = cache
+        self.metrics = metrics
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.http2 = http2 and _http2_available()
+
+        if self.http2:
+            import httpx
+            self.session = httpx.Client(
+                http2=True,
+                headers={'User-Agent': user_agent},
+                limits=httpx.Limits(max_keepalive_connections=pool_size),
+                follow_redirects=True,
+            )
+        else:
+            import requests
+            from urllib3.util.retry import Retry
+            retry = Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=('GET', 'HEAD'),
+                raise_on_status=False,
+            )
+            adapter = _timed_adapter(self, pool_connections=pool_size, pool_maxsize=pool_size,
+                                     max_retries=retry)
+            self.session = requests.Session()
+            self.session.headers['User-Agent'] = user_agent
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+    def get(self, url, stream=False, timeout=None, headers=None):
+        """GET url through the shared session; returns a requests-style response"""
+        timeout = timeout if timeout is not None else self.timeout
+        if self.cache is None:
+            return self._send(url, stream, timeout, headers)
+
+        conditional = self.cache.conditional_headers(url)
+        response = self._send(url, stream, timeout, {**conditional, **(headers or {})})
+        if response.status_code == 304:
+            response.close()
+            cached = self.cache.response(url)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.count('cache_hits')
+                return cached
+            # The entry vanished since the request was sent; fetch it in full
+            response = self._send(url, stream, timeout, headers)
+
+        if response.status_code == 200:
+            if not stream:
+                self.cache.store(url, response.headers, response.content)
+            elif self.cache.cacheable(response.headers):
+                return CachingResponse(response, self.cache, url)
+        return response
+
+    def _send(self, url, stream, timeout, headers):
+        start = time.perf_counter()
+        if self.http2:
+            response = self._get_http2(url, stream, timeout, headers)
+        else:
+            response = self.session.get(url, stream=stream, timeout=timeout, headers=headers)
+        if self.metrics is not None:
+            self.metrics.count('requests')
+            if stream:  # only headers have been read
+                self.metrics.observe('ttfb', time.perf_counter() - start)
+        return response
+
+    def _get_http2(self, url, stream, timeout, headers):
+        import httpx
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        for attempt in range(self.retries + 1):
+            request = self.session.build_request('GET', url, headers=headers, timeout=timeout)
+            response = self.session.send(request, stream=stream)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return Http2Response(response)
+            response.close()
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _timed_adapter(client, **kwargs):
+    """HTTPAdapter whose new connections report their connect time to client.metrics"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': _timed_pool(HTTPConnectionPool, client),
+                'https': _timed_pool(HTTPSConnectionPool, client),
+            }
+
+    return TimedHTTPAdapter(**kwargs)
+
+
+def _timed_pool(pool_class, client):
+    class TimedConnection(pool_class.ConnectionCls):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            if client.metrics is not None:
+                client.metrics.observe('connect', time.perf_counter() - start)
+
+    return type(pool_class.__name__, (pool_class,), {'ConnectionCls': TimedConnection})
+
+
+def read_text(response, max_bytes, chunk_size=64 * 1024):
+    """Stream a response body and decode it incrementally, stopping after max_bytes.
+
+    The charset comes from the Content-Type header, then from a <meta>
+    tag in the first chunk, then defaults to UTF-8. Returns
+    (text, size, truncated) where size is the number of body bytes read;
+    the response is closed either way.
+    """
+    encoding = _declared_charset(response.headers.get('content-type', ''))
+    decoder = None
+    parts = []
+    size = 0
+    truncated = False
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if decoder is None:
+                decoder = _decoder(encoding or _sniff_charset(chunk))
+            if size + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - size]
+                truncated = True
+            size += len(chunk)
+            parts.append(decoder.decode(chunk))
+            if truncated:
+                break
+        if decoder is not None:
+            parts.append(decoder.decode(b'', final=True))
+    finally:
+        response.close()
+    return ''.join(parts), size, truncated
+
+
+def _declared_charset(content_type):
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def _sniff_charset(chunk):
+    match = CHARSET_PATTERN.search(chunk[:2048])
+    return match.group(1).decode('ascii') if match else None
+
+
+def _decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+
+class CachingResponse:
+    """Wrap a streamed response so the body is copied into the cache as it is read.
+
+    Only a body that is read to the end is committed to the cache.
+    """
+    def __init__(self, response, cache, url):
+        self._response = response
+        self._cache = cache
+        self._url = url
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def iter_content(self, chunk_size=1):
+        writer = self._cache.writer(self._url, self._response.headers)
+        complete = False
+        try:
+            for chunk in self._response.iter_content(chunk_size):
+                writer.write(chunk)
+                yield chunk
+            complete = True
+        finally:
+            if complete:
+                writer.commit()
+            else:
+                writer.abort()
+
+
+class Http2Response:
+    """Expose an httpx response through the subset of the requests API we use"""
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def iter_content(self, chunk_size=1):
+        return self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+def _http2_available():
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def add_http_arguments(parser):
+    """Register the shared HTTP client options on an argparse parser"""
+    parser.add_argument('--user-agent', default=DEFAULT_USER_AGENT, help='User-Agent header sent with every request')
+    parser.add_argument('--pool-size', type=int, default=10, help='Keep-alive connections kept per host (default: 10)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries with backoff on 429/5xx and connection errors (default: 3)')
+    parser.add_argument('--http2', action='store_true', help='Use HTTP/2 when httpx[http2] is installed')
+    parser.add_argument('--cache-dir', help='HTTP cache directory (default: <output path>/.cache)')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the on-disk HTTP cache')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help='Maximum HTTP cache size in MB (default: 512)')
+
+
+def client_from_args(args, metrics=None):
+    cache = None
+    if not args.no_cache:
+        cache = HttpCache(args.cache_dir or os.path.join(args.p, '.cache'), args.cache_size * 1024 * 1024)
+    return HttpClient(pool_size=args.pool_size, retries=args.retries,
+                      user_agent=args.user_agent, http2=args.http2, cache=cache, metrics=metrics)
@@ -7,8 +7,15 @@ import os
 import sys
 import argparse
 import time
-import subprocess
 from colorama import init, Fore, Style, Back
+from crawl_engine import CrawlEngine, ImageExtractor, is_valid_image
+from downloader import DownloadPool, print_line
+from http_cache import HttpCache
+from http_client import HttpClient
+from politeness import Politeness
+import email_phone_extractor
+from email_phone_extractor import EmailPhoneExtractor
+import spider
 
 # Initialize colorama for cross-platform colored output
 init(autoreset=True)
@@ -96,34 +103,45 @@ class ArachnidaInterface:
         
         return url, recursive, depth, path
         
+    def run_tool(self, tool, argv):
+        """Run a tool's command line in this process; returns an error message, or None on success"""
+        try:
+            tool.main(argv)
+        except SystemExit as e:
+            if e.code:
+                return f"exit status {e.code}"
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
     def run_spider(self, url, recursive, depth, path):
-        """Run the spider script for images with beautiful output"""
-        cmd = ['python3', 'spider.py', url]
+        """Run the spider for images with beautiful output"""
+        argv = [url]
         if recursive:
-            cmd.append('-r')
-        cmd.extend(['-l', str(depth), '-p', path])
+            argv.append('-r')
+        argv.extend(['-l', str(depth), '-p', path])
         
         print(f"\n{Back.GREEN}{Fore.BLACK}{Style.BRIGHT} 🚀 LAUNCHING SPIDER {Style.RESET_ALL}")
         print(f"{Fore.GREEN}🕷️  Starting image extraction...")
         
-        try:
-            result = subprocess.run(cmd, check=True, capture_output=False)
+        error = self.run_tool(spider, argv)
+        if error is None:
             print(f"\n{Back.GREEN}{Fore.BLACK}{Style.BRIGHT} ✅ SUCCESS {Style.RESET_ALL}")
             print(f"{Fore.GREEN}🎉 Image extraction completed successfully!")
-        except subprocess.CalledProcessError as e:
+        else:
             print(f"\n{Back.RED}{Fore.WHITE}{Style.BRIGHT} ❌ ERROR {Style.RESET_ALL}")
-            print(f"{Fore.RED}💥 Error running spider: {e}")
+            print(f"{Fore.RED}💥 Error running spider: {error}")
             
     def run_email_phone_extractor(self, url, recursive, depth, path, emails_only=False, phones_only=False):
-        """Run the email/phone extractor script with beautiful output"""
-        cmd = ['python3', 'email_phone_extractor.py', url]
+        """Run the email/phone extractor with beautiful output"""
+        argv = [url]
         if recursive:
-            cmd.append('-r')
-        cmd.extend(['-l', str(depth), '-p', path])
+            argv.append('-r')
+        argv.extend(['-l', str(depth), '-p', path])
         if emails_only:
-            cmd.append('--emails-only')
+            argv.append('--emails-only')
         if phones_only:
-            cmd.append('--phones-only')
+            argv.append('--phones-only')
             
         print(f"\n{Back.BLUE}{Fore.WHITE}{Style.BRIGHT} 🚀 LAUNCHING EXTRACTOR {Style.RESET_ALL}")
         
@@ -134,14 +152,65 @@ class ArachnidaInterface:
         else:
             print(f"{Fore.YELLOW}📧📞 Starting email and phone extraction...")
             
-        try:
-            result = subprocess.run(cmd, check=True, capture_output=False)
+        error = self.run_tool(email_phone_extractor, argv)
+        if error is None:
             print(f"\n{Back.BLUE}{Fore.WHITE}{Style.BRIGHT} ✅ SUCCESS {Style.RESET_ALL}")
             print(f"{Fore.BLUE}🎉 Contact extraction completed successfully!")
-        except subprocess.CalledProcessError as e:
+        else:
             print(f"\n{Back.RED}{Fore.WHITE}{Style.BRIGHT} ❌ ERROR {Style.RESET_ALL}")
-            print(f"{Fore.RED}💥 Error running extractor: {e}")
+            print(f"{Fore.RED}💥 Error running extractor: {error}")
             
+    def run_everything(self, url, recursive, depth, path, emails=True, phones=True):
+        """Crawl once in-process, collecting images, emails and phones in the same pass"""
+        print(f"\n{Back.RED}{Fore.WHITE}{Style.BRIGHT} 🚀 LAUNCHING ONE-PASS CRAWL {Style.RESET_ALL}")
+        print(f"{Fore.RED}🎯 Starting image, email and phone extraction...")
+
+        os.makedirs(path, exist_ok=True)
+        if is_valid_image(url):
+            print(f"{Fore.MAGENTA}🖼️  Direct image URL detected")
+            spider.download_file(url, path)
+            return
+
+        client = HttpClient(cache=HttpCache(os.path.join(path, '.cache')))
+        with DownloadPool(path, client=client) as pool:
+            extractor = EmailPhoneExtractor()
+            engine = CrawlEngine([ImageExtractor(), extractor],
+                                 link_filter=lambda link: not is_valid_image(link), client=client,
+                                 politeness=Politeness(client))
+            all_emails = set()
+            all_phones = set()
+            downloaded = set()
+
+            for page in engine.crawl(url, depth if recursive else 1):
+                if page.depth == 1:
+                    print_line(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping everything... {Fore.YELLOW}{page.url}")
+                else:
+                    print_line(f"{Fore.CYAN}   └─ {Style.DIM}Depth {page.depth}: {page.url}")
+
+                if page.error:
+                    print_line(f"{Fore.RED}✗ Error: {page.error}")
+                    continue
+
+                spider.download_images(page, path, downloaded, pool)
+                page_emails, page_phones = page.results[extractor.name]
+                all_emails.update(page_emails)
+                all_phones.update(page_phones)
+                if page_emails or page_phones:
+                    print_line(f"   {Fore.GREEN}📧 {len(page_emails)} emails  📞 {len(page_phones)} phones")
+
+        if emails:
+            extractor.save_to_file(all_emails, os.path.join(path, 'emails.txt'), 'emails')
+        if phones:
+            extractor.save_to_file(all_phones, os.path.join(path, 'phones.txt'), 'phone numbers')
+
+        print(f"\n{Back.GREEN}{Fore.BLACK}{Style.BRIGHT} ✅ SUCCESS {Style.RESET_ALL}")
+        print(f"{Fore.GREEN}🎉 One-pass extraction completed successfully!")
+        pool.report()
+        if emails:
+            print(f"{Fore.BLUE}📧 Total emails found: {Fore.YELLOW}{len(all_emails)}")
+        if phones:
+            print(f"{Fore.BLUE}📞 Total phone numbers found: {Fore.YELLOW}{len(all_phones)}")
+
     def custom_options_menu(self):
         """Show custom options menu with improved design"""
         print(f"\n{Back.CYAN}{Fore.BLACK}{Style.BRIGHT} ⚙️  CUSTOM OPTIONS {Style.RESET_ALL}")
@@ -162,6 +231,11 @@ class ArachnidaInterface:
             
         url, recursive, depth, path = self.get_common_params()
         
+        # Images together with contacts share a single crawl
+        if choices['images'] and (choices['emails'] or choices['phones']):
+            self.run_everything(url, recursive, depth, path, choices['emails'], choices['phones'])
+            return
+
         # Run selected extractors
         if choices['images']:
             self.run_spider(url, recursive, depth, path)
@@ -213,8 +287,7 @@ class ArachnidaInterface:
                     
                 elif choice == '5':  # Everything
                     url, recursive, depth, path = self.get_common_params()
-                    self.run_spider(url, recursive, depth, path)
-                    self.run_email_phone_extractor(url, recursive, depth, path)
+                    self.run_everything(url, recursive, depth, path)
                     
                 elif choice == '6':  # Custom Options
                     self.custom_options_menu()
@@ -253,6 +326,7 @@ def main():
 Examples:
   python3 main_interface.py                    # Interactive mode
   python3 main_interface.py --cli --url example.com --type all -r
+  python3 main_interface.py --cli --url example.com --type all -r --separate
         """
     )
     
@@ -268,6 +342,8 @@ Examples:
                        help='Maximum depth level (CLI mode only)')
     parser.add_argument('-p', default='./data/', 
                        help='Output path (CLI mode only)')
+    parser.add_argument('--separate', action='store_true',
+                       help='With --type all, run the spider and extractor as two separate crawls (CLI mode only)')
     
     args = parser.parse_args()
     
@@ -277,6 +353,10 @@ Examples:
         print(f"{Fore.YELLOW}{'─' * 50}")
         interface = ArachnidaInterface()
         
+        if args.type == 'all' and not args.separate:
+            interface.run_everything(args.url, args.r, args.l, args.p)
+            return
+        
         if args.type in ['images', 'all']:
             interface.run_spider(args.url, args.r, args.l, args.p)
             
@@ -0,0 +1,192 @@
+"""
+Metrics - Crawl counters and per-stage timings
+by abderrafie
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from colorama import Fore, Style
+
+# Timed stages by the resource they wait on
+STAGE_GROUPS = {
+    'network': ('connect', 'ttfb', 'download', 'image_download'),
+    'parse': ('parse', 'extract.images', 'extract.links', 'extract.contacts'),
+    'disk': ('disk_write',),
+}
+
+
+class Metrics:
+    """Thread-safe counters and stage timings for one run.
+
+    Stage times are summed over every worker, so they show where the
+    work goes rather than how long the run took. With json_path the
+    snapshot is rewritten every interval seconds while the run is going.
+    """
+    def __init__(self, json_path=None, interval=5.0):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = Counter()
+        self.stages = {}  # stage -> [count, total seconds, max seconds]
+        self.json_path = json_path
+        self.server = None
+        self.stopped = threading.Event()
+        self.writer = None
+        if json_path:
+            self.writer = threading.Thread(target=self._write_periodically, args=(interval,), daemon=True)
+            self.writer.start()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def merge(self, timings):
+        """Record a {stage: seconds} dict measured elsewhere, e.g. in a worker process"""
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'elapsed': time.monotonic() - self.started,
+                'counters': dict(self.counters),
+                'stages': {stage: {'count': count, 'seconds': total, 'mean': total / count, 'max': longest}
+                           for stage, (count, total, longest) in self.stages.items()},
+            }
+
+    def bottleneck(self, snapshot=None):
+        """Name of the stage group (network, parse or disk) with the most time, or None"""
+        stages = (snapshot or self.snapshot())['stages']
+        totals = {group: sum(stages[stage]['seconds'] for stage in members if stage in stages)
+                  for group, members in STAGE_GROUPS.items()}
+        group = max(totals, key=totals.get)
+        return group if totals[group] > 0 else None
+
+    def prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = ['# TYPE arachnida_uptime_seconds gauge',
+                 f"arachnida_uptime_seconds {snapshot['elapsed']:.3f}"]
+        errors = []
+        for name, value in sorted(snapshot['counters'].items()):
+            if name.startswith('errors.'):
+                errors.append(f'arachnida_errors_total{{type="{name[len("errors."):]}"}} {value}')
+            else:
+                lines.append(f'# TYPE arachnida_{name}_total counter')
+                lines.append(f'arachnida_{name}_total {value}')
+        if errors:
+            lines.append('# TYPE arachnida_errors_total counter')
+            lines.extend(errors)
+        lines.append('# TYPE arachnida_stage_seconds summary')
+        for stage, entry in sorted(snapshot['stages'].items()):
+            lines.append(f'arachnida_stage_seconds_sum{{stage="{stage}"}} {entry["seconds"]:.6f}')
+            lines.append(f'arachnida_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the live Prometheus text on http://host:port/metrics from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def write_json(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _write_periodically(self, interval):
+        while not self.stopped.wait(interval):
+            self.write_json(self.json_path)
+
+    def close(self):
+        """Stop the endpoint and periodic writer, writing the JSON file a last time"""
+        self.stopped.set()
+        if self.writer is not None:
+            self.writer.join()
+            self.write_json(self.json_path)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def report(self):
+        """Print the end-of-run statistics"""
+        snapshot = self.snapshot()
+        counters = snapshot['counters']
+        elapsed = max(snapshot['elapsed'], 1e-6)
+        print(f"\n{Fore.CYAN}📊 {Style.BRIGHT}Crawl statistics ({elapsed:.1f}s)")
+        pages = counters.get('pages', 0)
+        print(f"{Fore.BLUE}   Pages: {Fore.YELLOW}{pages} ({pages / elapsed:.1f}/s), "
+              f"{counters.get('bytes', 0) / (1024 * 1024):.2f} MB, "
+              f"{counters.get('cache_hits', 0)} cache hits, {counters.get('skipped', 0)} skipped")
+        if counters.get('sitemaps'):
+            print(f"{Fore.BLUE}   Sitemaps: {Fore.YELLOW}{counters['sitemaps']} read, "
+                  f"{counters.get('sitemap_urls', 0)} pages queued from them")
+        errors = {name[len('errors.'):]: value for name, value in counters.items() if name.startswith('errors.')}
+        if errors:
+            listed = ', '.join(f'{name}: {value}' for name, value in sorted(errors.items()))
+            print(f"{Fore.RED}   Errors: {listed}")
+        for stage, entry in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"{Fore.BLUE}   {stage:<17}{Fore.YELLOW}{entry['seconds']:8.2f}s total "
+                  f"{entry['mean'] * 1000:8.1f}ms mean {entry['max'] * 1000:8.1f}ms max  ({entry['count']})")
+        bound = self.bottleneck(snapshot)
+        if bound:
+            print(f"{Fore.GREEN}   Most time is spent on {Style.BRIGHT}{bound}")
+
+
+def add_metrics_arguments(parser):
+    """Register the statistics options on an argparse parser"""
+    parser.add_argument('--stats', action='store_true',
+                        help='Print counters and per-stage timings (network, parse, disk) at the end')
+    parser.add_argument('--metrics-file', help='Keep a JSON snapshot of the statistics in this file, updated every 5s')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve live statistics in Prometheus text format on http://127.0.0.1:PORT/metrics')
+
+
+def metrics_from_args(args):
+    metrics = Metrics(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    return metrics
+
+
+def finish_metrics(metrics, args):
+    """Close the exporters and print the report when --stats is given"""
+    metrics.close()
+    if args.stats:
+        metrics.report()
@@ -0,0 +1,210 @@
+"""
+Politeness - robots.txt rules and per-host request pacing
+by abderrafie
+"""
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+from http_client import read_text
+
+ROBOTS_MAX_SIZE = 512 * 1024
+
+
+def robots_crawl_delay(lines, user_agent):
+    """Crawl-delay in seconds of the robots.txt group that applies to user_agent, or None.
+
+    urllib.robotparser drops values that are not whole numbers, such as
+    0.5 or 2.5, so the groups are read here. As in robotparser, the first
+    group naming the agent wins over the * group.
+    """
+    groups = []  # [user agents, crawl delay]
+    in_agents = False
+    for line in lines:
+        field, separator, value = line.split('#', 1)[0].partition(':')
+        if not separator:
+            continue
+        field, value = field.strip().lower(), value.strip()
+        if field == 'user-agent':
+            if not in_agents:
+                groups.append([[], None])
+            groups[-1][0].append(value.lower())
+            in_agents = True
+            continue
+        in_agents = False
+        if field == 'crawl-delay' and groups:
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            if math.isfinite(delay) and delay >= 0:
+                groups[-1][1] = delay
+    name = user_agent.split('/')[0].lower()
+    for agents, delay in groups:
+        if any(agent != '*' and agent in name for agent in agents):
+            return delay
+    return next((delay for agents, delay in groups if '*' in agents), None)
+
+
+class Politeness:
+    """robots.txt rules and per-host request pacing shared by a whole crawl.
+
+    robots.txt is fetched once per host, the first time a URL of that
+    host is checked, and kept for the rest of the crawl. A missing
+    robots.txt (404 and other 4xx) allows everything; 401/403 forbids the
+    host, and so does a server error or an unreachable server, as RFC 9309
+    asks while the site cannot say what it allows.
+
+    Requests to a host are paced by a token bucket holding up to burst
+    tokens and refilled at rate requests/s. A Crawl-delay or Request-rate
+    in robots.txt slows a host down further, and then allows no burst.
+    The crawler asks delay(host) before each request, so it can work on
+    other hosts while one is cooling down. A host first paced after its
+    first request, once its robots.txt is read, starts from that request
+    with an empty bucket.
+    """
+    def __init__(self, client, robots=True, rate=None, burst=1):
+        self.client = client
+        self.robots = robots
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.lock = threading.Lock()
+        self.rules = {}  # scheme://host -> RobotFileParser
+        self.fetch_locks = {}
+        self.intervals = {}  # host -> seconds between requests required by robots.txt
+        self.buckets = {}  # host -> [tokens, last refill]
+        self.requested = {}  # host -> time of its last request
+
+    def allowed(self, url):
+        """True if robots.txt lets us fetch url; fetches the host's robots.txt on first use"""
+        if not self.robots:
+            return True
+        rules = self._rules(url)
+        return rules.can_fetch(self.client.user_agent, url)
+
+    def disallowed(self, url):
+        """True if url's host has robots.txt rules loaded already and they forbid url"""
+        if not self.robots:
+            return False
+        parts = urlsplit(url)
+        rules = self.rules.get(f"{parts.scheme}://{parts.netloc}")
+        return rules is not None and not rules.can_fetch(self.client.user_agent, url)
+
+    def sitemaps(self, url):
+        """Sitemap URLs listed in the robots.txt of url's host; none when robots.txt is ignored"""
+        if not self.robots:
+            return []
+        return list(self._rules(url).site_maps() or [])
+
+    def _rules(self, url):
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            if key in self.rules:
+                return self.rules[key]
+            fetch_lock = self.fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:  # one fetch per host, other threads wait for it
+            if key not in self.rules:
+                rules, crawl_delay = self._fetch_rules(key + '/robots.txt')
+                with self.lock:
+                    self.rules[key] = rules
+                    interval = self._robots_interval(rules, crawl_delay)
+                    if interval:
+                        self.intervals[parts.netloc] = interval
+                        self.buckets.pop(parts.netloc, None)  # refilled from the last request
+        return self.rules[key]
+
+    def _fetch_rules(self, robots_url):
+        """(RobotFileParser, Crawl-delay for our user agent or None) of robots_url"""
+        from urllib.robotparser import RobotFileParser
+        rules = RobotFileParser(robots_url)
+        crawl_delay = None
+        try:
+            response = self.client.get(robots_url, stream=True)
+        except Exception:
+            rules.disallow_all = True
+            return rules, crawl_delay
+        if response.status_code in (401, 403) or response.status_code >= 500:
+            response.close()
+            rules.disallow_all = True
+        elif response.status_code != 200:
+            response.close()
+            rules.allow_all = True
+        else:
+            text, _, _ = read_text(response, ROBOTS_MAX_SIZE)
+            lines = text.splitlines()
+            rules.parse(lines)
+            crawl_delay = robots_crawl_delay(lines, self.client.user_agent)
+        return rules, crawl_delay
+
+    def _robots_interval(self, rules, crawl_delay):
+        user_agent = self.client.user_agent
+        interval = crawl_delay or 0
+        request_rate = rules.request_rate(user_agent)
+        if request_rate and request_rate.requests:
+            interval = max(interval, request_rate.seconds / request_rate.requests)
+        return interval
+
+    def _pace(self, host):
+        """(seconds between requests, burst) for host, or None when it is not paced"""
+        interval = self.intervals.get(host)
+        if interval:
+            return max(interval, 1 / self.rate if self.rate else 0), 1
+        if self.rate:
+            return 1 / self.rate, self.burst
+        return None
+
+    def delay(self, host):
+        """Seconds until host may be requested again; 0 if it may be requested now"""
+        with self.lock:
+            pace = self._pace(host)
+            if pace is None:
+                return 0
+            interval, burst = pace
+            tokens = self._refill(host, interval, burst)
+            return 0 if tokens >= 1 else (1 - tokens) * interval
+
+    def reserve(self, host):
+        """Take a token for a request to host"""
+        with self.lock:
+            self._take(host)
+
+    def acquire(self, host):
+        """Take a token for a request to host if one is available; False while host is cooling down"""
+        with self.lock:
+            pace = self._pace(host)
+            if pace is not None and self._refill(host, *pace) < 1:
+                return False
+            self._take(host)
+            return True
+
+    def _take(self, host):
+        pace = self._pace(host)
+        if pace is not None:
+            self._refill(host, *pace)
+            self.buckets[host][0] -= 1
+        self.requested[host] = time.monotonic()
+
+    def _refill(self, host, interval, burst):
+        now = time.monotonic()
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            last = self.requested.get(host)
+            bucket = self.buckets[host] = [burst, now] if last is None else [0, last]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) / interval)
+        bucket[1] = now
+        return bucket[0]
+
+
+def add_politeness_arguments(parser):
+    """Register the robots.txt and rate limit options on an argparse parser"""
+    parser.add_argument('--ignore-robots', action='store_true', help='Do not fetch or obey robots.txt')
+    parser.add_argument('--rate', type=float,
+                        help='Maximum requests per second to any single host (default: unlimited, '
+                             'unless robots.txt sets a Crawl-delay)')
+    parser.add_argument('--burst', type=int, default=1,
+                        help='Requests a host may receive back to back before --rate applies (default: 1)')
+
+
+def politeness_from_args(args, client):
+    return Politeness(client, robots=not args.ignore_robots, rate=args.rate, burst=args.burst)
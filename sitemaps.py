@@ -0,0 +1,203 @@
+"""
+Sitemaps - Seed a crawl from sitemap.xml and sitemap indexes
+by abderrafie
+"""
+import argparse
+import itertools
+import time
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from frontier import canonicalize_url
+
+SITEMAP_MAX_SIZE = 50 * 1024 * 1024  # uncompressed limit set by the sitemaps protocol
+
+
+def parse_lastmod(value):
+    """Timezone-aware datetime of a W3C datetime such as 2024, 2024-05 or 2024-05-01T10:00Z, or None"""
+    value = (value or '').strip()
+    if len(value) == 4:
+        value += '-01-01'
+    elif len(value) == 7:
+        value += '-01'
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def parse_since(value):
+    """argparse type for --sitemap-since"""
+    moment = parse_lastmod(value)
+    if moment is None:
+        raise argparse.ArgumentTypeError(f'expected a date such as 2024-05-01, not {value!r}')
+    return moment
+
+
+def recency_priority(lastmod):
+    """Frontier priority of a sitemap page: its age in seconds, so recently modified pages come first"""
+    if lastmod is None:
+        return float('inf')
+    return max(0.0, (datetime.now(timezone.utc) - lastmod).total_seconds())
+
+
+class Sitemaps:
+    """Pages a site lists in its sitemaps.
+
+    Sitemaps are found through the Sitemap: lines of robots.txt when a
+    Politeness is given and obeys robots.txt, and at /sitemap.xml
+    otherwise. Sitemap indexes are followed, gzipped sitemaps are
+    decompressed on the fly and XML is parsed as it downloads, so a
+    50 MB sitemap is never held in memory. Only sitemaps and pages on the
+    seed's own host are followed, so a sitemap index or a Sitemap: line
+    cannot send the crawl to another site.
+
+    With since, pages and child sitemaps whose lastmod is older are
+    skipped; entries without a lastmod are always kept.
+    """
+    def __init__(self, client, politeness=None, since=None, chunk_size=64 * 1024):
+        self.client = client
+        self.politeness = politeness
+        self.since = since
+        self.chunk_size = chunk_size
+
+    def locations(self, seed):
+        """Sitemap URLs declared for seed's site"""
+        if self.politeness is not None:
+            declared = self.politeness.sitemaps(seed)
+            if declared:
+                return declared
+        parts = urlsplit(seed)
+        return [f'{parts.scheme}://{parts.netloc}/sitemap.xml']
+
+    def urls(self, seed):
+        """Yield (url, lastmod) for every page on seed's host listed in its sitemaps"""
+        host = _host(seed)
+        pending = [location for location in self.locations(seed) if _host(location) == host]
+        fetched = set()
+        while pending:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
+            for kind, loc, lastmod in self.entries(sitemap_url):
+                if self.since is not None and lastmod is not None and lastmod < self.since:
+                    continue
+                if _host(loc) != host:
+                    continue
+                if kind == 'sitemap':
+                    pending.append(loc)
+                else:
+                    yield loc, lastmod
+
+    def entries(self, sitemap_url):
+        """Yield ('url' or 'sitemap', loc, lastmod) for each entry of one sitemap or sitemap index"""
+        metrics = self.client.metrics
+        self._pace(sitemap_url)
+        try:
+            response = self.client.get(sitemap_url, stream=True)
+            response.raise_for_status()
+        except Exception:
+            if metrics is not None:
+                metrics.count('errors.sitemap')
+            return
+        if metrics is not None:
+            metrics.count('sitemaps')
+        try:
+            chunks = self._decoded_chunks(response)
+            first = next(chunks, b'')
+            parse = self._parse_xml if first.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<') else self._parse_text
+            yield from parse(itertools.chain([first], chunks))
+        except Exception:
+            if metrics is not None:
+                metrics.count('errors.sitemap')
+        finally:
+            response.close()
+
+    def _pace(self, url):
+        if self.politeness is None:
+            return
+        host = urlsplit(url).netloc
+        time.sleep(self.politeness.delay(host))
+        self.politeness.reserve(host)
+
+    def _decoded_chunks(self, response):
+        """Body chunks, gunzipped when the body is gzip data, up to SITEMAP_MAX_SIZE bytes"""
+        decompressor = None
+        size = 0
+        for chunk in response.iter_content(self.chunk_size):
+            if decompressor is None and size == 0 and chunk[:2] == b'\x1f\x8b':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            while chunk:
+                if decompressor is not None:
+                    data = decompressor.decompress(chunk, self.chunk_size)
+                    chunk = decompressor.unconsumed_tail
+                else:
+                    data, chunk = chunk, b''
+                size += len(data)
+                if size > SITEMAP_MAX_SIZE:
+                    return
+                yield data
+
+    @staticmethod
+    def _parse_xml(chunks):
+        from xml.etree.ElementTree import XMLPullParser
+        parser = XMLPullParser(events=('start', 'end'))
+        root = None
+        for data in chunks:
+            parser.feed(data)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    root = element if root is None else root
+                    continue
+                kind = _local_name(element.tag)
+                if kind not in ('url', 'sitemap'):
+                    continue
+                values = {_local_name(child.tag): (child.text or '').strip() for child in element}
+                if values.get('loc'):
+                    yield kind, values['loc'], parse_lastmod(values.get('lastmod'))
+                element.clear()
+                if len(root) and root[-1] is element:
+                    root.remove(element)  # keep memory flat however long the sitemap is
+        parser.close()
+
+    @staticmethod
+    def _parse_text(chunks):
+        """Plain text sitemap: one URL per line"""
+        rest = b''
+        for data in chunks:
+            *lines, rest = (rest + data).split(b'\n')
+            yield from _text_entries(lines)
+        yield from _text_entries([rest])
+
+
+def _text_entries(lines):
+    for line in lines:
+        url = line.decode('utf-8', 'replace').strip()
+        if url.startswith(('http://', 'https://')):
+            yield 'url', url, None
+
+
+def _host(url):
+    return urlsplit(canonicalize_url(url)).netloc
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+def add_sitemap_arguments(parser):
+    """Register the sitemap seeding options on an argparse parser"""
+    parser.add_argument('--sitemap', action='store_true',
+                        help="Also queue every page listed in the site's sitemaps (found through robots.txt, "
+                             "or at /sitemap.xml), most recently modified first")
+    parser.add_argument('--sitemap-since', type=parse_since, metavar='DATE',
+                        help='With --sitemap, skip pages whose sitemap lastmod is older than DATE, e.g. 2024-05-01')
+
+
+def sitemaps_from_args(args, client, politeness):
+    """Sitemaps for the --sitemap options, or None when they are not used"""
+    if not args.sitemap:
+        return None
+    return Sitemaps(client, politeness, args.sitemap_since)
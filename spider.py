@@ -6,121 +6,168 @@ by abderrafie
 import os
 import sys
 import argparse
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
 from colorama import init, Fore, Style
+from crawl_engine import CrawlEngine, ImageExtractor, is_valid_image, DEFAULT_MAX_PAGE_SIZE
+from assets import parse_image_size
+from checkpoint import Checkpoint
+from downloader import DownloadPool, download_file, print_line
+from frontier import canonicalize_url, read_seeds, site_name
+from html_parsers import PARSER_CHOICES, resolve_parser
+from metrics import add_metrics_arguments, finish_metrics, metrics_from_args
+from http_client import add_http_arguments, client_from_args
+from politeness import add_politeness_arguments, politeness_from_args
+from sitemaps import add_sitemap_arguments, sitemaps_from_args
 
 # Initialize colorama
 init(autoreset=True)
 
-def is_valid_image(url):
-    extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-    if any(url.lower().endswith(ext) for ext in extensions):
-        return True
-    parsed_url = urlparse(url)
-    path = parsed_url.path.lower()
-    if any(path.endswith(ext) for ext in extensions):
-        return True
-    return False
-
-def download_file(url, path):
-    try:
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            parsed_url = urlparse(url)
-            filename = os.path.basename(parsed_url.path)
-        
-            if not filename or not any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']):
-                content_type = response.headers.get('content-type', '')
-                ext = '.jpg'  # default
-                if 'png' in content_type:
-                    ext = '.png'
-                elif 'gif' in content_type:
-                    ext = '.gif'
-                elif 'bmp' in content_type:
-                    ext = '.bmp'
-            
-                filename = f"image_{hash(url) % 100000}{ext}"
-            
-            filepath = os.path.join(path, filename)
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
-            print(f"{Fore.GREEN}   ✓ {Style.BRIGHT}{filename}")
+def report_page(page):
+    """Print the scraping indicator for a crawled page"""
+    if page.depth == 1:
+        print_line(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping images... {Fore.YELLOW}{page.url}")
+    else:
+        print_line(f"{Fore.CYAN}   └─ {Style.DIM}Depth {page.depth}: {page.url}")
+
+def download_images(page, path, seen=None, pool=None):
+    """Download the images found on a page, including linked images.
+
+    Images whose canonical URL is already in seen are skipped. With a
+    DownloadPool the downloads are queued instead of run inline.
+    Returns the image URLs that were downloaded or queued.
+    """
+    images = list(page.results.get('images', []))
+    images.extend(link for link in page.links if is_valid_image(link))
+    if seen is not None:
+        images = [img_url for img_url in dict.fromkeys(map(canonicalize_url, images))
+                  if img_url not in seen]
+        seen.update(images)
+
+    for img_url in images:
+        if pool is not None:
+            pool.submit(img_url, path)
         else:
-            print(f"{Fore.RED}   ✗ Failed: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"{Fore.RED}   ✗ Error: {e}")
+            download_file(img_url, path)
 
-def get_links(url, base_domain):
-    """Extract all links from a webpage that belong to the same domain"""
-    try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        links = set()
-        
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            absolute_url = urljoin(url, href)
-            parsed_url = urlparse(absolute_url)
-            if parsed_url.netloc == base_domain.netloc:
-                links.add(absolute_url)
-                
-        return links
-    except Exception as e:
-        print(f"{Fore.RED}✗ Failed to get links: {e}")
-        return set()
-
-def spider(url, recursive, max_depth, path, current_depth=1):
-    if current_depth > max_depth:
-        return
-        
-    # Nice scraping indicator
-    if current_depth == 1:
-        print(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping images... {Fore.YELLOW}{url}")
-    else:
-        print(f"{Fore.CYAN}   └─ {Style.DIM}Depth {current_depth}: {url}")
-    
-    if is_valid_image(url):
-        print(f"{Fore.MAGENTA}🖼️  Direct image URL detected")
-        download_file(url, path)
-        return
-    
-    try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        images_found = 0
-        for img in soup.find_all('img', src=True):
-            img_url = urljoin(url, img['src'])
-            if is_valid_image(img_url):
-                download_file(img_url, path)
-                images_found += 1
-        
-        if images_found > 0:
-            print(f"   {Fore.GREEN}🖼️  Found {images_found} images")
-    except Exception as e:
-        print(f"{Fore.RED}✗ Error: {e}")
-    
-    if recursive and current_depth < max_depth:
-        base_domain = urlparse(url)
-        links = get_links(url, base_domain)
-        
-        for link in links:
-            spider(link, recursive, max_depth, path, current_depth + 1)
-
-def main():
+    if images:
+        print_line(f"   {Fore.GREEN}🖼️  Found {len(images)} images")
+    return images
+
+def spider(url, recursive, max_depth, path, sort_query=False, concurrency=1, per_host=2, pool=None,
+           client=None, checkpoint=None, parser='auto', max_page_size=DEFAULT_MAX_PAGE_SIZE, workers=0,
+           politeness=None, image_size='largest', sitemaps=None, frontier_dir=None):
+    """Download the images of one site, or of several when url is a list of seeds.
+
+    With a list of seeds all sites are crawled together and each site's
+    images go to a subdirectory of path named after it. image_size picks
+    which rendition of a responsive image is downloaded.
+    """
+    partitioned = not isinstance(url, str)
+    seeds = list(url) if partitioned else [url]
+
+    def output_path(page_url):
+        return os.path.join(path, site_name(page_url)) if partitioned else path
+
+    def result_kind(page_url):
+        return f'image:{site_name(page_url)}' if partitioned else 'image'
+
+    owns_pool = pool is None
+    if owns_pool:
+        pool = DownloadPool(path, client=client)
+
+    for seed in [seed for seed in seeds if is_valid_image(seed)]:
+        print_line(f"{Fore.CYAN}🕷️  {Style.BRIGHT}Scraping images... {Fore.YELLOW}{seed}")
+        print_line(f"{Fore.MAGENTA}🖼️  Direct image URL detected")
+        pool.submit(seed, output_path(seed))
+    seeds = [seed for seed in seeds if not is_valid_image(seed)]
+
+    if seeds:
+        engine = CrawlEngine([ImageExtractor(image_size)], link_filter=lambda link: not is_valid_image(link),
+                             sort_query=sort_query, concurrency=concurrency, per_host=per_host,
+                             client=client or pool.client, checkpoint=checkpoint, parser=parser,
+                             max_page_size=max_page_size, workers=workers,
+                             politeness=politeness, sitemaps=sitemaps, frontier_dir=frontier_dir)
+        downloaded = set()
+        if checkpoint is not None:
+            # Images queued by an interrupted run; stored ones are skipped by the manifest
+            for seed in {site_name(seed): seed for seed in seeds}.values():
+                for img_url in sorted(checkpoint.results(result_kind(seed))):
+                    downloaded.add(img_url)
+                    pool.submit(img_url, output_path(seed))
+
+        for page in engine.crawl(seeds, max_depth if recursive else 1):
+            report_page(page)
+            if page.error:
+                print_line(f"{Fore.RED}✗ Error: {page.error}")
+                continue
+            images = download_images(page, output_path(page.url), downloaded, pool)
+            if checkpoint is not None:
+                checkpoint.add_results(result_kind(page.url), images)
+
+    if owns_pool:
+        pool.close()
+        pool.report()
+
+def main(argv=None):
+    """Command line entry point; argv defaults to sys.argv[1:]"""
     parser = argparse.ArgumentParser(description='Spider by abderrafie - website image downloader')
-    parser.add_argument('url', help='URL to process')
+    parser.add_argument('url', nargs='?', help='URL to process')
+    parser.add_argument('--seeds', metavar='FILE',
+                        help="Crawl every URL listed in FILE ('-' for stdin), saving each site to its own subdirectory")
     parser.add_argument('-r', action='store_true', help='Recursive download')
     parser.add_argument('-l', type=int, default=5, help='Maximum depth level for recursive download')
     parser.add_argument('-p', default='./data/', help='Path to save downloaded files')
+    parser.add_argument('--sort-query', action='store_true', help='Treat URLs differing only in query parameter order as the same page')
+    parser.add_argument('--max-page-size', type=float, default=5,
+                        help='Maximum page size in MB; larger pages are cut off (default: 5)')
+    parser.add_argument('--parser', choices=PARSER_CHOICES, default='auto',
+                        help='HTML parser backend; auto picks the fastest available (default: auto)')
+    parser.add_argument('-j', '--concurrency', type=int, default=1, help='Number of pages fetched concurrently (default: 1)')
+    parser.add_argument('--per-host', type=int, default=2, help='Maximum concurrent connections per host (default: 2)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Parse pages in N worker processes to use several cores (default: 0, parse in threads)')
+    parser.add_argument('--image-size', type=parse_image_size, default='largest', metavar='{largest,smallest,WIDTH}',
+                        help='Rendition to download from a srcset: largest, smallest or the narrowest one at least WIDTH pixels wide (default: largest)')
+    parser.add_argument('--download-workers', type=int, default=4, help='Number of parallel image downloads (default: 4)')
+    parser.add_argument('--connect-timeout', type=float, default=5, help='Image connect timeout in seconds (default: 5)')
+    parser.add_argument('--read-timeout', type=float, default=30, help='Image read timeout in seconds (default: 30)')
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024, help='Image download chunk size in bytes (default: 65536)')
+    parser.add_argument('--dedup', action='store_true', help='Store each image once under its content hash')
+    parser.add_argument('--disk-frontier', action='store_true',
+                        help='Keep the queue of discovered URLs in a temporary SQLite file in the output '
+                             'directory instead of memory, for very large crawls')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted crawl from its checkpoint')
+    add_http_arguments(parser)
+    add_politeness_arguments(parser)
+    add_sitemap_arguments(parser)
+    add_metrics_arguments(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if (args.url is None) == (args.seeds is None):
+        parser.error('give either a URL or --seeds FILE')
+    try:
+        resolve_parser(args.parser)
+    except ValueError as e:
+        parser.error(str(e))
+    target = read_seeds(args.seeds) if args.seeds else args.url
+    if not target:
+        parser.error(f'no seed URLs in {args.seeds}')
     os.makedirs(args.p, exist_ok=True)
     
-    spider(args.url, args.r, args.l, args.p)
+    metrics = metrics_from_args(args)
+    client = client_from_args(args, metrics)
+    checkpoint = Checkpoint(args.p, 'spider', resume=args.resume)
+    politeness = politeness_from_args(args, client)
+    with DownloadPool(args.p, args.download_workers, args.connect_timeout,
+                      args.read_timeout, args.chunk_size, client, args.dedup) as pool:
+        spider(target, args.r, args.l, args.p, sort_query=args.sort_query, concurrency=args.concurrency,
+               per_host=args.per_host, pool=pool, client=client, checkpoint=checkpoint, parser=args.parser,
+               max_page_size=int(args.max_page_size * 1024 * 1024), workers=args.workers,
+               politeness=politeness, image_size=args.image_size,
+               sitemaps=sitemaps_from_args(args, client, politeness),
+               frontier_dir=args.p if args.disk_frontier else None)
+    checkpoint.close()
+    pool.report()
+    finish_metrics(metrics, args)
     print(f"{Fore.GREEN}🎉 {Style.BRIGHT}Download completed! Images saved to: {Fore.YELLOW}{args.p}")
 
 if __name__ == '__main__':